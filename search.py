@@ -73,7 +73,12 @@ class Node:
     the total path_cost (also known as g) to reach the node. Other functions
     may add an f and h value; see best_first_graph_search and astar_search for
     an explanation of how the f and h values are handled. You will not need to
-    subclass this class."""
+    subclass this class.
+    Nodes use __slots__ instead of a per-instance __dict__, so that large
+    frontiers take less memory; the f and h slots are left unset until
+    memoize(f, 'f') / memoize(h, 'h') fill them in."""
+
+    __slots__ = ('state', 'parent', 'action', 'path_cost', 'depth', 'f', 'h')
 
     def __init__(self, state, parent=None, action=None, path_cost=0):
         """Create a search tree Node, derived from a parent by an action."""
@@ -99,7 +104,7 @@ class Node:
     def child_node(self, problem, action):
         """[Figure 3.10]"""
         next_state = problem.result(self.state, action)
-        next_node = Node(next_state, self, action, problem.path_cost(self.path_cost, self.state, action, next_state))
+        next_node = type(self)(next_state, self, action, problem.path_cost(self.path_cost, self.state, action, next_state))
         return next_node
 
     def solution(self):
@@ -130,6 +135,66 @@ class Node:
         return hash(self.state)
 
 
+class ActionsNode(Node):
+    """A Node that does not keep its parent alive. It only keeps the actions
+    from the root, as a chain of (earlier actions, action) pairs shared
+    with its siblings, so solution() still works but path() does not."""
+
+    __slots__ = ('actions',)
+
+    def __init__(self, state, parent=None, action=None, path_cost=0):
+        super().__init__(state, None, action, path_cost)
+        self.actions = None
+        if parent:
+            self.depth = parent.depth + 1
+            self.actions = (parent.actions, action)
+
+    def solution(self):
+        """Return the sequence of actions to go from the root to this node."""
+        actions, chain = [], self.actions
+        while chain:
+            chain, action = chain
+            actions.append(action)
+        return actions[::-1]
+
+    def path(self):
+        raise ValueError("path() needs a search with path='parent'")
+
+
+class StateNode(Node):
+    """A Node that keeps neither its parent nor the actions: only the state,
+    the action that produced it, the path cost and the depth. For problems
+    where only the goal state matters."""
+
+    __slots__ = ()
+
+    def __init__(self, state, parent=None, action=None, path_cost=0):
+        super().__init__(state, None, action, path_cost)
+        if parent:
+            self.depth = parent.depth + 1
+
+    def solution(self):
+        raise ValueError("solution() needs a search with path='parent' or 'actions'")
+
+    def path(self):
+        raise ValueError("path() needs a search with path='parent'")
+
+
+# What each node remembers of the way from the root: 'parent' keeps the
+# whole chain of nodes (and their states) alive, 'actions' only the actions
+# and 'none' nothing, so that only the frontier states use memory.
+PATH_MODES = {
+    'parent': Node,
+    'actions': ActionsNode,
+    'none': StateNode,
+}
+
+
+def root_node(problem, path='parent'):
+    """The search tree root for the problem, with the given path mode."""
+    return PATH_MODES[path](problem.initial)
+
+
 # ______________________________________________________________________________
 
 
@@ -175,16 +240,17 @@ class SimpleProblemSolvingAgentProgram:
 # Uninformed Search algorithms
 
 
-def breadth_first_tree_search(problem):
+def breadth_first_tree_search(problem, path='parent'):
     """
     [Figure 3.7]
     Search the shallowest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
     The argument frontier should be an empty queue.
     Repeats infinitely in case of loops.
+    The path argument is one of PATH_MODES (what each node remembers).
     """
 
-    frontier = deque([Node(problem.initial)])  # FIFO queue
+    frontier = deque([root_node(problem, path)])  # FIFO queue
 
     while frontier:
         node = frontier.popleft()
@@ -194,16 +260,17 @@ def breadth_first_tree_search(problem):
     return None
 
 
-def depth_first_tree_search(problem):
+def depth_first_tree_search(problem, path='parent'):
     """
     [Figure 3.7]
     Search the deepest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
     The argument frontier should be an empty queue.
     Repeats infinitely in case of loops.
+    The path argument is one of PATH_MODES (what each node remembers).
     """
 
-    frontier = [Node(problem.initial)]  # Stack
+    frontier = [root_node(problem, path)]  # Stack
 
     while frontier:
         node = frontier.pop()
@@ -213,7 +280,7 @@ def depth_first_tree_search(problem):
     return None
 
 
-def depth_first_graph_search(problem):
+def depth_first_graph_search(problem, path='parent'):
     """
     [Figure 3.7]
     Search the deepest nodes in the search tree first.
@@ -221,52 +288,65 @@ def depth_first_graph_search(problem):
     The argument frontier should be an empty queue.
     Does not get trapped by loops.
     If two paths reach a state, only use the first one.
+    The path argument is one of PATH_MODES (what each node remembers).
     """
-    frontier = [(Node(problem.initial))]  # Stack
+    frontier = [(root_node(problem, path))]  # Stack
+    # States currently on the frontier, kept in sync with the stack so the
+    # duplicate check is O(1) (nodes compare equal when their states do)
+    frontier_states = {frontier[0].state}
 
     explored = set()
     while frontier:
         node = frontier.pop()
+        frontier_states.discard(node.state)
         if problem.goal_test(node.state):
             return node
         explored.add(node.state)
-        frontier.extend(child for child in node.expand(problem)
-                        if child.state not in explored and child not in frontier)
+        for child in node.expand(problem):
+            if child.state not in explored and child.state not in frontier_states:
+                frontier.append(child)
+                frontier_states.add(child.state)
     return None
 
 
-def breadth_first_graph_search(problem):
+def breadth_first_graph_search(problem, path='parent'):
     """[Figure 3.11]
     Note that this function can be implemented in a
     single line as below:
     return graph_search(problem, FIFOQueue())
+    The path argument is one of PATH_MODES (what each node remembers).
     """
-    node = Node(problem.initial)
+    node = root_node(problem, path)
     if problem.goal_test(node.state):
         return node
     frontier = deque([node])
+    # States currently on the frontier (see depth_first_graph_search)
+    frontier_states = {node.state}
     explored = set()
     while frontier:
         node = frontier.popleft()
+        frontier_states.discard(node.state)
         explored.add(node.state)
         for child in node.expand(problem):
-            if child.state not in explored and child not in frontier:
+            if child.state not in explored and child.state not in frontier_states:
                 if problem.goal_test(child.state):
                     return child
                 frontier.append(child)
+                frontier_states.add(child.state)
     return None
 
 
-def best_first_graph_search(problem, f, display=False):
+def best_first_graph_search(problem, f, display=False, path='parent'):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
+    a best first search you can examine the f values of the path returned.
+    The path argument is one of PATH_MODES (what each node remembers)."""
     f = memoize(f, 'f')
-    node = Node(problem.initial)
+    node = root_node(problem, path)
     frontier = PriorityQueue('min', f)
     frontier.append(node)
     explored = set()
@@ -287,12 +367,12 @@ def best_first_graph_search(problem, f, display=False):
     return None
 
 
-def uniform_cost_search(problem, display=False):
+def uniform_cost_search(problem, display=False, path='parent'):
     """[Figure 3.14]"""
-    return best_first_graph_search(problem, lambda node: node.path_cost, display)
+    return best_first_graph_search(problem, lambda node: node.path_cost, display, path)
 
 
-def depth_limited_search(problem, limit=50):
+def depth_limited_search(problem, limit=50, path='parent'):
     """[Figure 3.17]"""
 
     def recursive_dls(node, problem, limit):
@@ -311,13 +391,13 @@ def depth_limited_search(problem, limit=50):
             return 'cutoff' if cutoff_occurred else None
 
     # Body of depth_limited_search:
-    return recursive_dls(Node(problem.initial), problem, limit)
+    return recursive_dls(root_node(problem, path), problem, limit)
 
 
-def iterative_deepening_search(problem):
+def iterative_deepening_search(problem, path='parent'):
     """[Figure 3.18]"""
     for depth in range(sys.maxsize):
-        result = depth_limited_search(problem, depth)
+        result = depth_limited_search(problem, depth, path)
         if result != 'cutoff':
             return result
 
@@ -410,17 +490,17 @@ greedy_best_first_graph_search = best_first_graph_search
 
 
 # Greedy best-first search is accomplished by specifying f(n) = h(n).
-def greedy_search(problem, h=None):
+def greedy_search(problem, h=None, path='parent'):
     """f(n) = h(n)"""
     h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, h)
+    return best_first_graph_search(problem, h, path=path)
 
-def astar_search(problem, h=None, display=False):
+def astar_search(problem, h=None, display=False, path='parent'):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
     else in your Problem subclass."""
     h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display)
+    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display, path)
 
 
 # ______________________________________________________________________________
@@ -6,9 +6,15 @@
 # 99216 Filipa Magalhães
 # 99275 Mário Santos
 
+import argparse
+import functools
+import itertools
 import sys
 from sys import stdin
 import numpy as np
+from takuzu_lines import exclude_lines, filter_lines, line_agreement, line_domains
+from takuzu_dp import WorkLimit, row_solutions
+from takuzu_sat import solve_board
 from search import (
     Problem,
     Node,
@@ -21,10 +27,13 @@ from search import (
 
 # --------------------------------- TAKUZU STATE ------------------------------
 class TakuzuState:
+    __slots__ = ("board", "consistent", "id")
     state_id = 0
 
-    def __init__(self, board):
+    def __init__(self, board, consistent=True):
         self.board = board
+        # False se a propagação encontrou uma contradição neste estado
+        self.consistent = consistent
         self.id = TakuzuState.state_id
         TakuzuState.state_id += 1
 
@@ -34,12 +43,398 @@ class TakuzuState:
     def __lt__(self, other):
         return self.id < other.id
 
+    def __eq__(self, other):
+        """Dois estados são iguais se os tabuleiros tiverem as mesmas
+        posições preenchidas com os mesmos valores, seja qual for a ordem
+        por que foram preenchidas."""
+        return (isinstance(other, TakuzuState) and
+                self.board.zobrist == other.board.zobrist and
+                self.board.same_cells(other.board))
+
+    def __hash__(self):
+        return self.board.zobrist
+
+
+# ----------------------------- CONTADORES DE REGRAS ---------------------------
+def line_violations(filled: int, ones: int, size: int) -> (int, int):
+    """Devolve (1 se há três números iguais seguidos, 1 se há demasiados
+    0's ou 1's) para a linha/coluna dada pelas suas máscaras."""
+    zeros = filled ^ ones
+    max_num_value = (size + 1) >> 1
+    triple = 1 if (ones & (ones >> 1) & (ones >> 2) or
+                   zeros & (zeros >> 1) & (zeros >> 2)) else 0
+    unbalanced = 1 if (ones.bit_count() > max_num_value or
+                       zeros.bit_count() > max_num_value) else 0
+    return triple, unbalanced
+
+
+def line_status(filled: int, ones: int, size: int) -> tuple:
+    """Devolve (três iguais seguidos, 0's/1's a mais, nº de posições vazias,
+    folga) da linha/coluna dada pelas suas máscaras. A folga é quantos 0's ou
+    1's (o menor dos dois) ainda cabem na linha, ou 'size' + 1 se estiver
+    completa (com N = 1, uma linha vazia tem folga 'size')."""
+    zeros = filled ^ ones
+    max_num_value = (size + 1) >> 1
+    num_ones = ones.bit_count()
+    num_zeros = zeros.bit_count()
+    empty = size - num_ones - num_zeros
+    triple = 1 if (ones & (ones >> 1) & (ones >> 2) or
+                   zeros & (zeros >> 1) & (zeros >> 2)) else 0
+    room_one = max_num_value - num_ones
+    room_zero = max_num_value - num_zeros
+    unbalanced = 1 if room_one < 0 or room_zero < 0 else 0
+    if empty == 0:
+        slack = size + 1
+    elif unbalanced:
+        slack = 0
+    else:
+        slack = room_one if room_one < room_zero else room_zero
+    return triple, unbalanced, empty, slack
+
+
+class LineBuckets:
+    """Fila de prioridade das linhas (ou colunas) de um eixo, indexada por uma
+    chave inteira pequena. Cada balde é uma máscara de bits das linhas com
+    essa chave e 'levels' marca os baldes não vazios, pelo que mover uma
+    linha ou obter a de menor chave são só operações sobre inteiros."""
+    def __init__(self, buckets: list, levels: int):
+        self.buckets = buckets  # chave -> máscara das linhas com essa chave
+        self.levels = levels    # bit c a 1 se o balde c não está vazio
+
+    @staticmethod
+    def with_all(size: int, num_keys: int, key: int):
+        """Cria a fila com as 'size' linhas todas com a chave 'key'."""
+        buckets = [0] * num_keys
+        buckets[key] = (1 << size) - 1
+        return LineBuckets(buckets, 1 << key)
+
+    def copy(self):
+        """Devolve uma cópia da fila."""
+        return LineBuckets(self.buckets[:], self.levels)
+
+    def move(self, k: int, key: int, new_key: int):
+        """Muda a chave da linha k."""
+        if key == new_key:
+            return
+        buckets = self.buckets
+        bit = 1 << k
+        remaining = buckets[key] ^ bit
+        buckets[key] = remaining
+        if not remaining:
+            self.levels ^= 1 << key
+        if not buckets[new_key]:
+            self.levels |= 1 << new_key
+        buckets[new_key] |= bit
+
+    def lowest(self, min_key: int = 0):
+        """Devolve (chave, máscara das linhas) do balde não vazio de menor
+        chave >= min_key, ou None se não houver."""
+        levels = self.levels >> min_key
+        if not levels:
+            return None
+        key = min_key + (levels & -levels).bit_length() - 1
+        return key, self.buckets[key]
+
+
+class LineCounters:
+    """Contadores das violações das regras do Takuzu, atualizados a cada
+    atribuição, para que o teste objetivo não tenha de percorrer o tabuleiro.
+    Mantém também, por eixo, as linhas ordenadas pelo número de posições
+    vazias e pela folga até um dos valores esgotar, usadas para escolher
+    onde ramificar."""
+    def __init__(self, size: int, status: list, complete: list, triples: int,
+     unbalanced: int, duplicates: int, patterns: list, empties: list,
+     slacks: list):
+        self.size = size
+        # por eixo, resultado de line_status para cada linha/coluna
+        self.status = status
+        self.complete = complete        # nº de linhas/colunas completas
+        self.triples = triples          # linhas/colunas com 3 iguais seguidos
+        self.unbalanced = unbalanced    # linhas/colunas com 0's/1's a mais
+        self.duplicates = duplicates    # linhas/colunas completas repetidas
+        # por eixo, máscara de 1's de cada linha completa -> nº de ocorrências
+        self.patterns = patterns
+        # por eixo, LineBuckets com chave = nº de posições vazias
+        self.empties = empties
+        # por eixo, LineBuckets com chave = menor nº de 0's ou 1's que ainda
+        # cabem na linha (as linhas completas ficam com a chave 'size' + 1)
+        self.slacks = slacks
+
+    @staticmethod
+    def from_board(board):
+        """Calcula os contadores de um tabuleiro a partir do zero."""
+        size = int(board.size)
+        max_num_value = (size + 1) // 2
+        status = [[line_status(0, 0, size)] * size for _ in (0, 1)]
+        empties = [LineBuckets.with_all(size, size + 1, size) for _ in (0, 1)]
+        slacks = [LineBuckets.with_all(size, size + 2, max_num_value)
+                  for _ in (0, 1)]
+        counters = LineCounters(size, status, [0, 0], 0, 0, 0, [{}, {}],
+            empties, slacks)
+        for axis in (0, 1):
+            for k in range(size):
+                filled, ones = board.line_masks(axis, k)
+                counters.update(axis, k, 0, 0, filled, ones)
+        return counters
+
+    def copy(self):
+        """Devolve uma cópia dos contadores."""
+        return LineCounters(self.size, [self.status[0][:], self.status[1][:]],
+            self.complete[:], self.triples, self.unbalanced, self.duplicates,
+            [self.patterns[0].copy(), self.patterns[1].copy()],
+            [self.empties[0].copy(), self.empties[1].copy()],
+            [self.slacks[0].copy(), self.slacks[1].copy()])
+
+    def update(self, axis: int, k: int, filled: int, ones: int,
+     new_filled: int, new_ones: int):
+        """Atualiza os contadores quando a linha k (axis = 0) ou a coluna k
+        (axis = 1) passa das máscaras (filled, ones) para (new_filled,
+        new_ones)."""
+        status = line_status(new_filled, new_ones, self.size)
+        old_status = self.status[axis][k]
+        if status == old_status:
+            return
+        self.status[axis][k] = status
+        self.triples += status[0] - old_status[0]
+        self.unbalanced += status[1] - old_status[1]
+        self.empties[axis].move(k, old_status[2], status[2])
+        self.slacks[axis].move(k, old_status[3], status[3])
+
+        patterns = self.patterns[axis]
+        if old_status[2] == 0:
+            self.complete[axis] -= 1
+            count = patterns[ones]
+            if count > 1:
+                self.duplicates -= 1
+                patterns[ones] = count - 1
+            else:
+                del patterns[ones]
+        if status[2] == 0:
+            self.complete[axis] += 1
+            count = patterns.get(new_ones, 0)
+            if count > 0:
+                self.duplicates += 1
+            patterns[new_ones] = count + 1
+
+    def is_consistent(self):
+        """Verifica se nenhuma regra está a ser violada."""
+        return self.triples == 0 and self.unbalanced == 0 and self.duplicates == 0
+
+    def is_solved(self):
+        """Verifica se o tabuleiro está completo e respeita todas as regras."""
+        return self.complete[0] == self.size and self.is_consistent()
+
+
+def copy_domains(domains):
+    """Copia as listas de domínios (os arrays são partilhados, porque a
+    filtragem cria sempre arrays novos)."""
+    if domains is None:
+        return None
+    return [domains[0][:], domains[1][:]]
+
+
+# ---------------------------------- ZOBRIST ----------------------------------
+@functools.lru_cache(maxsize=64)
+def zobrist_table(size: int) -> np.ndarray:
+    """Chaves aleatórias (fixas para cada tamanho) de 64 bits, numa matriz
+    uint64 (N*N x 2): a posição (i, j) com o valor v contribui com a chave
+    [i*size + j, v] para o hash do tabuleiro, que é o ou-exclusivo das
+    chaves das posições preenchidas e pode ser atualizado a cada
+    atribuição."""
+    rng = np.random.default_rng(size)
+    return rng.integers(0, 1 << 64, size=(size * size, 2), dtype=np.uint64)
+
+
+@functools.lru_cache(maxsize=64)
+def zobrist_keys(size: int) -> tuple:
+    """As chaves de zobrist_table como inteiros (keys[i*size + j][v]),
+    mais rápidos de usar a cada atribuição."""
+    return tuple(map(tuple, zobrist_table(size).tolist()))
+
+
+def zobrist_hash(board) -> int:
+    """Calcula de raiz o hash de Zobrist de um tabuleiro: ou-exclusivo,
+    calculado pelo NumPy, das chaves das posições preenchidas."""
+    cells = board.to_array().ravel()
+    filled = np.flatnonzero(cells != 2)
+    keys = zobrist_table(int(board.size))[filled, cells[filled]]
+    return int(np.bitwise_xor.reduce(keys))
+
+
+# --------------------------------- HEURÍSTICA ---------------------------------
+def sum_empty_squares(board) -> int:
+    """Calcula de raiz a heurística do tabuleiro: cada posição vazia soma as
+    posições vazias da sua linha e da sua coluna, ou seja, o total é a soma
+    dos quadrados das posições vazias por linha/coluna. Os tabuleiros
+    mantêm este valor a cada atribuição (ver Board.set_number)."""
+    rows = np.asarray(board.num_values_row, dtype=np.int64)[:, 1]
+    cols = np.asarray(board.num_values_col, dtype=np.int64)[:, 1]
+    return int(rows @ rows + cols @ cols)
+
+
+# ---------------------------------- LEITURA ----------------------------------
+# Cada instância é uma linha com N seguida de N linhas com os valores 0, 1 e 2
+# (separados por tabs). As linhas de uma instância são lidas com readline (que
+# devolve cada linha assim que está disponível, mesmo num pipe) e convertidas
+# de uma só vez numa matriz uint8, sem percorrer os caracteres em Python;
+# várias instâncias seguidas no mesmo stream são lidas uma a uma.
+
+def parse_cells(lines: list, size: int) -> np.ndarray:
+    """Converte as N linhas (texto ou bytes) de uma instância numa matriz
+    N x N do tipo uint8. Tudo o que não é 0, 1 ou 2 é ignorado."""
+    data = b"".join(line.encode() if isinstance(line, str) else line
+                    for line in lines)
+    data = np.frombuffer(data, dtype=np.uint8)
+    cells = data[(data >= ord("0")) & (data <= ord("2"))] - ord("0")
+    if cells.size != size * size:
+        raise ValueError("Esperados {} valores numa instância de tamanho {}, "
+            "lidos {}.".format(size * size, size, cells.size))
+    return cells.reshape(size, size)
+
+
+def read_cells(stream):
+    """Lê a próxima instância de um stream (de texto ou binário) e devolve a
+    sua matriz (ver parse_cells), ou None se o stream já não tiver nenhuma.
+    Linhas vazias antes da instância são ignoradas; não é lido nada depois
+    da última linha da instância."""
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        if line.strip():
+            break
+
+    size = int(line)
+    rows = [stream.readline() for _ in range(size)]
+    if size > 0 and not rows[-1]:
+        raise ValueError("Instância incompleta no fim do input.")
+    return parse_cells(rows, size)
+
+
+def read_instance(stream):
+    """Como read_cells, mas levanta ValueError se não houver instância."""
+    cells = read_cells(stream)
+    if cells is None:
+        raise ValueError("O input não tem nenhuma instância.")
+    return cells
+
+
+def iter_cells(stream):
+    """Gera a matriz (ver parse_cells) de cada uma das instâncias seguidas
+    num stream, à medida que são lidas."""
+    while True:
+        cells = read_cells(stream)
+        if cells is None:
+            return
+        yield cells
+
+
+def iter_boards(stream, board_class=None):
+    """Gera um tabuleiro (Board, ou a classe dada) por cada instância do
+    stream."""
+    board_class = board_class or Board
+    for cells in iter_cells(stream):
+        yield board_class.from_cells(cells)
+
+
+# ------------------------------- BASE BOARD ----------------------------------
+class BaseBoard:
+    """Parte comum a Board e BitBoard: o que é mantido a cada atribuição
+    (contadores de violações, hash de Zobrist e heurística), os domínios e
+    a sondagem. As subclasses guardam as posições e definem get_number,
+    line_masks, get_counters, copy_cells, from_cells, set_number e
+    unset_number."""
+    def init_tracking(self, domains=None, zobrist=None, empty_squares=None):
+        """Inicializa o que não depende da representação; chamado no fim
+        do construtor das subclasses, já com as posições e as contagens."""
+        # linhas candidatas de cada linha/coluna (ver takuzu_lines), ou None
+        self.domains = domains
+        # resultados da última sondagem (ver probe_literals), ou None
+        self.probes = None
+        # hash de Zobrist das posições preenchidas, mantido a cada atribuição
+        self.keys = zobrist_keys(int(self.size))
+        if zobrist is None:
+            zobrist = zobrist_hash(self)
+        self.zobrist = zobrist
+        # heurística (ver sum_empty_squares), mantida a cada atribuição
+        if empty_squares is None:
+            empty_squares = sum_empty_squares(self)
+        self.empty_squares = empty_squares
+
+    def track_change(self, row: int, col: int, value: int, filled: bool):
+        """Atualiza os contadores de violações, o hash de Zobrist e a
+        heurística quando a posição (row, col) passa a ter 'value' (filled)
+        ou deixa de o ter. Tem de ser chamado antes de as posições e as
+        contagens da subclasse mudarem."""
+        counters = self.get_counters()
+        row_filled, row_ones = self.line_masks(0, row)
+        col_filled, col_ones = self.line_masks(1, col)
+        empty = int(self.num_values_row[row][1] + self.num_values_col[col][1])
+        if filled:
+            counters.update(0, row, row_filled, row_ones,
+                row_filled | 1 << col, row_ones | value << col)
+            counters.update(1, col, col_filled, col_ones,
+                col_filled | 1 << row, col_ones | value << row)
+            # -> e^2 passa a (e-1)^2 na linha e na coluna
+            self.empty_squares -= 2 * empty - 2
+        else:
+            counters.update(0, row, row_filled, row_ones,
+                row_filled & ~(1 << col), row_ones & ~(1 << col))
+            counters.update(1, col, col_filled, col_ones,
+                col_filled & ~(1 << row), col_ones & ~(1 << row))
+            # -> e^2 passa a (e+1)^2 na linha e na coluna
+            self.empty_squares += 2 * empty + 2
+        self.zobrist ^= self.keys[row * self.size + col][value]
+
+    @classmethod
+    def parse_instance_from_stdin(cls):
+        """Lê o test do standard input (stdin) que é passado como argumento
+        e retorna uma instância da classe."""
+        return cls.parse_instance(stdin)
+
+    @classmethod
+    def parse_instance(cls, stream):
+        """Lê uma instância do stream de texto dado (no formato do stdin)
+        e retorna uma instância da classe."""
+        return cls.from_cells(read_instance(stream))
+
+    def get_board(self, action):
+        """Faz uma cópia para uma nova instância da classe
+        depois de executada uma ação."""
+
+        i, j, val = action[0], action[1], action[2]
+
+        newBoard = self.copy()
+        newBoard.set_number(i, j, val)
+        return newBoard
+
+    def copy(self):
+        """Devolve uma cópia do tabuleiro (ver copy_cells), com os mesmos
+        resultados da sondagem."""
+        board = self.copy_cells()
+        board.probes = self.probes
+        return board
+
+    def is_consistent(self):
+        """Verifica se nenhuma regra está já a ser violada."""
+        return self.get_counters().is_consistent()
+
+    def is_solved(self):
+        """Verifica se o tabuleiro está completo e respeita todas as regras."""
+        return self.get_counters().is_solved()
+
+    def heuristic(self):
+        """Devolve o valor da heuristica do tabuleiro (ver
+        sum_empty_squares), mantido a cada atribuição."""
+        return self.empty_squares
+
 
 # ----------------------------------- BOARD -----------------------------------
-class Board:
+class Board(BaseBoard):
     """Representação interna de um tabuleiro de Takuzu."""
     def __init__(self, matrix: np.ndarray, size: int, num_values_row: list,
-     num_values_col: list):
+     num_values_col: list, counters=None, domains=None, zobrist=None,
+     empty_squares=None):
         """O construtor especifica o estado inicial."""
         self.matrix = matrix    # matriz do tabuleiro (lista de listas)
         self.size = size        # tamanho do tabuleiro
@@ -47,6 +442,9 @@ class Board:
         self.num_values_row = num_values_row    
         # número de vezes que os valores 1 e 2 aparecem por coluna
         self.num_values_col = num_values_col
+        # contadores de violações (calculados apenas quando necessários)
+        self.counters = counters
+        self.init_tracking(domains, zobrist, empty_squares)
 
     def __str__(self):
         """Retorna a string equivalente à representação externa
@@ -98,88 +496,747 @@ class Board:
         return (left, right)
 
     @staticmethod
-    def parse_instance_from_stdin():
-        """Lê o test do standard input (stdin) que é passado como argumento
-        e retorna uma instância da classe Board."""
+    def from_cells(cells: np.ndarray):
+        """Constrói um Board a partir de uma matriz N x N de valores 0, 1 e
+        2 (ver parse_cells). As contagens são somas ao longo dos eixos."""
+        size = len(cells)
+        num_values_row = np.stack([(cells == 1).sum(axis=1),
+            (cells == 2).sum(axis=1)], axis=1).astype(int)
+        num_values_col = np.stack([(cells == 1).sum(axis=0),
+            (cells == 2).sum(axis=0)], axis=1).astype(int)
+        # Inteiros com sinal: as ações calculam abs(valor - 1)
+        return Board(cells.astype(int), size, num_values_row, num_values_col)
 
-        size = int(stdin.readline())
-        matrix = [[0]*size for _ in range(size)]
-        num_values_row = np.zeros([size, 2], dtype = int)
-        num_values_col = np.zeros([size, 2], dtype = int)
+    def copy_cells(self):
+        """Devolve uma cópia do tabuleiro, sem os resultados da sondagem."""
+        counters = self.counters.copy() if self.counters is not None else None
+        domains = copy_domains(self.domains)
+        return Board(np.array(self.matrix), int(self.size),
+            np.copy(self.num_values_row), np.copy(self.num_values_col),
+            counters, domains, self.zobrist, self.empty_squares)
 
-        for i in range(size):
-            j = 0
-            line = stdin.readline()
-            lineSize = len(line)
-            for _ in range(lineSize):
-            
-                if line[_] in ['0', '1', '2']:
-                    value = int(line[_])
-                    matrix[i][j] = value
-
-                    if value != 0:
-                        num_values_row[i][value-1] += 1
-                        num_values_col[j][value-1] += 1
-                    j += 1
-
-        board = Board(matrix, size, num_values_row, num_values_col)
-        return board
+    def get_counters(self):
+        """Devolve os contadores de violações, calculando-os se preciso."""
+        if self.counters is None:
+            self.counters = LineCounters.from_board(self)
+        return self.counters
 
+    def set_number(self, row: int, col: int, value: int):
+        """Preenche uma posição vazia do tabuleiro (altera-o)."""
+        self.track_change(row, col, value, True)
+        self.matrix[row][col] = value
+        if value == 1:
+            self.num_values_row[row][0] += 1
+            self.num_values_col[col][0] += 1
+        self.num_values_row[row][1] -= 1
+        self.num_values_col[col][1] -= 1
 
-    def get_board(self, action):
-        """Faz uma cópia para uma nova instância da classe Board
-        depois de executada uma ação."""
+    def unset_number(self, row: int, col: int):
+        """Volta a deixar vazia uma posição preenchida (altera o tabuleiro)."""
+        value = int(self.matrix[row][col])
+        self.track_change(row, col, value, False)
+        if value == 1:
+            self.num_values_row[row][0] -= 1
+            self.num_values_col[col][0] -= 1
+        self.num_values_row[row][1] += 1
+        self.num_values_col[col][1] += 1
+        self.matrix[row][col] = 2
 
-        newBoard = Board(self.matrix, self.size, self.num_values_row, \
-            self.num_values_col)
+    def line_masks(self, axis: int, k: int) -> (int, int):
+        """Devolve as máscaras de bits (posições preenchidas, posições a 1)
+        da linha k (axis = 0) ou da coluna k (axis = 1)."""
+        filled = ones = 0
+        for pos in range(self.size):
+            if axis == 0:
+                value = self.matrix[k][pos]
+            else:
+                value = self.matrix[pos][k]
+            if value != 2:
+                filled |= 1 << pos
+                if value == 1:
+                    ones |= 1 << pos
+        return filled, ones
 
-        i, j, val = action[0], action[1], action[2]
-        
-        newMatrix = np.copy(self.matrix)
-        newMatrix[i][j] = val
+    def same_cells(self, other) -> bool:
+        """Verifica se os dois tabuleiros têm o mesmo conteúdo."""
+        return np.array_equal(self.matrix, other.matrix)
 
-        newSize = np.copy(self.size)
+    def to_array(self) -> np.ndarray:
+        """Devolve a matriz de valores (uint8, como em parse_cells)."""
+        return np.asarray(self.matrix, dtype=np.uint8)
 
-        newValues_row = np.copy(self.num_values_row)
-        if val == 1:
-            newValues_row[i][0] += 1
-        newValues_row[i][1] -= 1
 
-        newValues_col = np.copy(self.num_values_col)
-        if val == 1:
-            newValues_col[j][0] += 1
-        newValues_col[j][1] -= 1
+# --------------------------------- BIT BOARD ---------------------------------
+class BitBoard(BaseBoard):
+    """Representação alternativa do tabuleiro de Takuzu, em que cada linha e
+    cada coluna é guardada como um par de máscaras de bits (posições
+    preenchidas e posições com o valor 1). O bit j da linha i e o bit i da
+    coluna j correspondem ambos à posição (i, j)."""
+    def __init__(self, size: int, row_filled: list, row_ones: list,
+     col_filled: list, col_ones: list, num_values_row: list,
+     num_values_col: list, counters=None, domains=None, zobrist=None,
+     empty_squares=None):
+        """O construtor especifica o estado inicial."""
+        self.size = size
+        self.row_filled = row_filled    # posições preenchidas por linha
+        self.row_ones = row_ones        # posições a 1 por linha
+        self.col_filled = col_filled    # posições preenchidas por coluna
+        self.col_ones = col_ones        # posições a 1 por coluna
+        # (número de 1's, número de posições vazias) por linha/coluna,
+        # com a mesma convenção de Board
+        self.num_values_row = num_values_row
+        self.num_values_col = num_values_col
+        # contadores de violações, mantidos a cada atribuição
+        if counters is None:
+            counters = LineCounters.from_board(self)
+        self.counters = counters
+        self.init_tracking(domains, zobrist, empty_squares)
 
-        newBoard = Board(newMatrix, newSize, newValues_row, newValues_col)
-        return newBoard
+    def __str__(self):
+        """Retorna a string equivalente à representação externa
+            do tabuleiro."""
+        return "\n".join("\t".join(str(self.get_number(i, j))
+            for j in range(self.size)) for i in range(self.size))
 
+    def get_number(self, row: int, col: int) -> int:
+        """Devolve o valor na respetiva posição do tabuleiro."""
+        bit = 1 << col
+        if not self.row_filled[row] & bit:
+            return 2
+        return 1 if self.row_ones[row] & bit else 0
 
-    def heuristic(self):
-        """Devolve o valor da heuristica do tabuleiro."""
-        h = 0
-        
-        for i in range(self.size):
-            if (self.num_values_row[i][1] == 0):
+    def adjacent_vertical_numbers(self, row: int, col: int) -> (int, int):
+        """Devolve os valores imediatamente abaixo e acima,
+        respectivamente."""
+        low = self.get_number(row+1, col) if row < self.size - 1 else None
+        up = self.get_number(row-1, col) if row > 0 else None
+        return (low, up)
+
+    def adjacent_horizontal_numbers(self, row: int, col: int) -> (int, int):
+        """Devolve os valores imediatamente à esquerda e à direita,
+        respectivamente."""
+        left = self.get_number(row, col-1) if col > 0 else None
+        right = self.get_number(row, col+1) if col < self.size - 1 else None
+        return (left, right)
+
+    @staticmethod
+    def from_cells(cells: np.ndarray):
+        """Constrói um BitBoard a partir de uma matriz N x N de valores 0, 1
+        e 2 (ver parse_cells): as máscaras de cada linha/coluna saem de
+        np.packbits, e as contagens de somas ao longo dos eixos."""
+        size = len(cells)
+
+        def masks(bits):
+            packed = np.packbits(bits, axis=1, bitorder="little")
+            return [int.from_bytes(line.tobytes(), "little") for line in packed]
+
+        filled, ones = cells != 2, cells == 1
+        num_values_row = list(zip(ones.sum(axis=1).tolist(),
+            (size - filled.sum(axis=1)).tolist()))
+        num_values_col = list(zip(ones.sum(axis=0).tolist(),
+            (size - filled.sum(axis=0)).tolist()))
+
+        return BitBoard(size, masks(filled), masks(ones), masks(filled.T),
+            masks(ones.T), num_values_row, num_values_col)
+
+    def copy_cells(self):
+        """Devolve uma cópia do tabuleiro, sem os resultados da sondagem. As
+        máscaras são inteiros imutáveis, pelo que basta copiar as listas que
+        as contêm."""
+        return BitBoard(self.size, self.row_filled[:], self.row_ones[:],
+            self.col_filled[:], self.col_ones[:], self.num_values_row[:],
+            self.num_values_col[:], self.counters.copy(),
+            copy_domains(self.domains), self.zobrist, self.empty_squares)
+
+    def get_counters(self):
+        """Devolve os contadores de violações."""
+        return self.counters
+
+    def set_number(self, row: int, col: int, value: int):
+        """Preenche uma posição vazia do tabuleiro (altera-o)."""
+        self.track_change(row, col, value, True)
+        ones, empty = self.num_values_row[row]
+        self.num_values_row[row] = (ones + value, empty - 1)
+        ones, empty = self.num_values_col[col]
+        self.num_values_col[col] = (ones + value, empty - 1)
+
+        self.row_filled[row] |= 1 << col
+        self.col_filled[col] |= 1 << row
+        if value == 1:
+            self.row_ones[row] |= 1 << col
+            self.col_ones[col] |= 1 << row
+
+    def unset_number(self, row: int, col: int):
+        """Volta a deixar vazia uma posição preenchida (altera o tabuleiro)."""
+        value = 1 if self.row_ones[row] >> col & 1 else 0
+        self.track_change(row, col, value, False)
+        ones, empty = self.num_values_row[row]
+        self.num_values_row[row] = (ones - value, empty + 1)
+        ones, empty = self.num_values_col[col]
+        self.num_values_col[col] = (ones - value, empty + 1)
+
+        self.row_filled[row] &= ~(1 << col)
+        self.col_filled[col] &= ~(1 << row)
+        self.row_ones[row] &= ~(1 << col)
+        self.col_ones[col] &= ~(1 << row)
+
+    def line_masks(self, axis: int, k: int) -> (int, int):
+        """Devolve as máscaras de bits (posições preenchidas, posições a 1)
+        da linha k (axis = 0) ou da coluna k (axis = 1)."""
+        if axis == 0:
+            return self.row_filled[k], self.row_ones[k]
+        return self.col_filled[k], self.col_ones[k]
+
+    def same_cells(self, other) -> bool:
+        """Verifica se os dois tabuleiros têm o mesmo conteúdo."""
+        return (self.row_filled == other.row_filled and
+                self.row_ones == other.row_ones)
+
+    def to_array(self) -> np.ndarray:
+        """Devolve a matriz de valores (uint8, como em parse_cells),
+        desempacotando as máscaras das linhas com np.unpackbits."""
+        size = int(self.size)
+        width = (size + 7) // 8
+
+        def bits(masks):
+            data = b"".join(mask.to_bytes(width, "little") for mask in masks)
+            packed = np.frombuffer(data, dtype=np.uint8).reshape(size, width)
+            return np.unpackbits(packed, axis=1, bitorder="little")[:, :size]
+
+        return np.where(bits(self.row_filled), bits(self.row_ones),
+            2).astype(np.uint8)
+
+
+# -------------------------------- PROPAGAÇÃO ---------------------------------
+def line_deductions(filled: int, ones: int, size: int):
+    """Aplica as regras do Takuzu a uma linha/coluna dada pelas suas máscaras.
+    Devolve (posições forçadas a 0, posições forçadas a 1), ou None se a
+    linha já não tem solução."""
+    full = (1 << size) - 1
+    max_num_value = (size + 1) // 2
+    zeros = filled & ~ones
+    empty = full & ~filled
+
+    # -> Três números iguais seguidos ou demasiados 0's/1's?
+    if any(line_violations(filled, ones, size)):
+        return None
+    num_ones = ones.bit_count()
+    num_zeros = zeros.bit_count()
+
+    # -> tipo 0 2 0
+    force_one = (zeros << 1) & (zeros >> 1)
+    force_zero = (ones << 1) & (ones >> 1)
+    # -> tipo 2 0 0 e 0 0 2
+    pairs = zeros & (zeros >> 1)
+    force_one |= (pairs << 2) | (pairs >> 1)
+    pairs = ones & (ones >> 1)
+    force_zero |= (pairs << 2) | (pairs >> 1)
+    # -> Completar linha/coluna
+    if num_ones == max_num_value:
+        force_zero |= empty
+    if num_zeros == max_num_value:
+        force_one |= empty
+
+    force_zero &= empty
+    force_one &= empty
+    if force_zero & force_one:
+        return None
+    return force_zero, force_one
+
+
+def duplicate_deductions(filled: int, ones: int, size: int, patterns: dict):
+    """Para uma linha/coluna com uma ou duas posições vazias, considera só as
+    formas de a completar que respeitam as regras e não repetem uma
+    linha/coluna já completa ('patterns'). Devolve (posições forçadas a 0,
+    posições forçadas a 1), ou None se nenhuma forma for possível."""
+    full = (1 << size) - 1
+    empty = full & ~filled
+    cells = []
+    rest = empty
+    while rest:
+        low = rest & -rest
+        rest ^= low
+        cells.append(low)
+
+    can_zero = can_one = 0
+    found = False
+    for choice in range(1 << len(cells)):
+        new_ones = ones
+        for n, bit in enumerate(cells):
+            if choice >> n & 1:
+                new_ones |= bit
+        if new_ones in patterns or any(line_violations(full, new_ones, size)):
+            continue
+        found = True
+        can_one |= new_ones & empty
+        can_zero |= ~new_ones & empty
+
+    if not found:
+        return None
+    return empty & ~can_one, empty & ~can_zero
+
+
+def propagate_constraints(board, dirty=None, trail=None, reasons=None):
+    """Aplica todas as deduções forçadas ao tabuleiro (alterando-o) até não
+    haver mais nenhuma. 'dirty' é a lista inicial de linhas (0, i) e colunas
+    (1, j) a rever; por omissão são revistas todas. Se 'trail' for dado, as
+    posições preenchidas são lá registadas para poderem ser desfeitas. Se
+    'reasons' (ConflictReasons) for dado, regista também de que decisões
+    depende cada posição preenchida e, numa contradição, as decisões que a
+    causaram. Devolve False se encontrar uma contradição."""
+    size = int(board.size)
+    if dirty is None:
+        dirty = [(axis, k) for axis in (0, 1) for k in range(size)]
+    queued = set(dirty)
+    full = (1 << size) - 1
+    patterns = board.get_counters().patterns
+    num_values = (board.num_values_row, board.num_values_col)
+    domains = board.domains
+
+    def enqueue(line):
+        if line not in queued:
+            queued.add(line)
+            dirty.append(line)
+
+    while dirty:
+        line = dirty.pop()
+        queued.discard(line)
+        axis, k = line
+
+        filled, ones = board.line_masks(axis, k)
+        # Decisões de que dependem as deduções desta linha: as das suas
+        # posições e, se forem usadas, as das linhas completas do mesmo eixo
+        because = reasons.line[axis][k] if reasons is not None else 0
+        deductions = line_deductions(filled, ones, size)
+        if deductions is None:
+            if reasons is not None:
+                reasons.conflict = because
+            return False
+
+        force_zero, force_one = deductions
+
+        # -> Linhas/colunas todas diferentes
+        empty = num_values[axis][k][1]
+        if reasons is not None and (empty <= 2 or domains is not None):
+            because |= reasons.complete_lines(board, axis)
+        if empty == 0:
+            if patterns[axis][ones] > 1:
+                if reasons is not None:
+                    reasons.conflict = because
+                return False
+        elif empty <= 2:
+            forced = duplicate_deductions(filled, ones, size, patterns[axis])
+            if forced is None:
+                if reasons is not None:
+                    reasons.conflict = because
+                return False
+            force_zero |= forced[0]
+            force_one |= forced[1]
+
+        # -> Linhas candidatas compatíveis com a linha/coluna
+        if domains is not None and empty > 0:
+            domain = domains[axis][k]
+            new_domain = filter_lines(domain, filled, ones)
+            if patterns[axis]:
+                new_domain = exclude_lines(new_domain, patterns[axis])
+            if len(new_domain) == 0:
+                if reasons is not None:
+                    reasons.conflict = because
+                return False
+            if new_domain is not domain:
+                domains[axis][k] = new_domain
+                if trail is not None:
+                    trail.append((axis, k, domain))
+            forced = line_agreement(new_domain, size)
+            empty_mask = full & ~filled
+            force_zero |= forced[0] & empty_mask
+            force_one |= forced[1] & empty_mask
+
+        if force_zero & force_one:
+            if reasons is not None:
+                reasons.conflict = because
+            return False
+        deductions = (force_zero, force_one)
+
+        for value, mask in enumerate(deductions):
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                pos = low.bit_length() - 1
+                row, col = (k, pos) if axis == 0 else (pos, k)
+                board.set_number(row, col, value)
+                if trail is not None:
+                    trail.append((row, col))
+                if reasons is not None:
+                    reasons.assign(row, col, because)
+
+                # A linha e a coluna da posição têm de ser revistas
+                enqueue((0, row))
+                enqueue((1, col))
+
+                # Uma linha/coluna que fica completa pode forçar as outras
+                # (do mesmo eixo) a que faltam uma ou duas posições
+                for done_axis, done in ((0, row), (1, col)):
+                    if num_values[done_axis][done][1] == 0:
+                        for other in range(size):
+                            if 0 < num_values[done_axis][other][1] <= 2:
+                                enqueue((done_axis, other))
+
+    return True
+
+
+def probe_order(board) -> list:
+    """Posições livres por ordem de sondagem: primeiro as que têm menos
+    posições vazias na linha e na coluna, onde é mais provável que um dos
+    valores leve logo a uma contradição."""
+    size = int(board.size)
+    cells = []
+    for i in range(size):
+        row_empty = board.num_values_row[i][1]
+        if row_empty == 0:
+            continue
+        filled, _ = board.line_masks(0, i)
+        empty = ((1 << size) - 1) & ~filled
+        while empty:
+            low = empty & -empty
+            empty ^= low
+            j = low.bit_length() - 1
+            cells.append((row_empty + board.num_values_col[j][1], i, j))
+    cells.sort()
+    return [(i, j) for _, i, j in cells]
+
+
+def set_probes(board, probes, trail=None):
+    """Muda board.probes, registando em 'trail' (se dado) o valor anterior
+    para que undo_trail o reponha."""
+    if trail is not None:
+        trail.append((board.probes,))
+    board.probes = probes
+
+
+def probe_literals(board, budget: int, trail=None) -> bool:
+    """Sondagem de literais falhados: com o tabuleiro já propagado, tenta
+    cada valor de cada posição livre, propaga e desfaz. Um valor que leva a
+    uma contradição é impossível, pelo que o outro é atribuído (e propagado)
+    de vez; repete até não haver mais deduções ou se esgotarem as 'budget'
+    tentativas. As posições preenchidas são registadas em 'trail', se
+    dado. Guarda em board.probes (ver set_probes), para cada posição em que
+    os dois valores sobreviveram, quantas posições cada valor preencheu.
+    Devolve False se encontrar uma contradição."""
+    changed = True
+    while changed and budget > 0:
+        changed = False
+        scores = {}
+        for row, col in probe_order(board):
+            if budget <= 0:
+                break
+            if board.get_number(row, col) != 2:
                 continue
 
-            for j in range(self.size):
-                if self.matrix[i][j] == 2:
-                    h += self.num_values_row[i][1] + self.num_values_col[j][1]
+            filled = []
+            for value in (0, 1):
+                budget -= 1
+                probe = [(row, col)]
+                board.set_number(row, col, value)
+                consistent = (propagate_constraints(board, [(0, row), (1, col)], probe)
+                              and board.is_consistent())
+                filled.append(sum(len(entry) == 2 for entry in probe))
+                undo_trail(board, probe, 0)
+                if consistent:
+                    continue
+
+                # -> O valor falhou: a posição fica com o outro
+                board.set_number(row, col, 1 - value)
+                if trail is not None:
+                    trail.append((row, col))
+                if (not propagate_constraints(board, [(0, row), (1, col)], trail)
+                        or not board.is_consistent()):
+                    set_probes(board, None, trail)
+                    return False
+                changed = True
+                break
+            else:
+                scores[(row, col)] = tuple(filled)
+        set_probes(board, scores, trail)
+    return True
+
+
+# ------------------------------ REGRAS VETORIZADAS ----------------------------
+# As regras locais de local_actions (vizinhos iguais dos dois lados, dois
+# iguais seguidos, linha/coluna com o máximo de um valor) calculadas para
+# todas as posições de uma vez sobre a matriz do tabuleiro, com comparações
+# entre a matriz e cópias deslocadas dela ao longo dos dois eixos.
+
+def forced_moves(cells: np.ndarray) -> (np.ndarray, np.ndarray, bool):
+    """Devolve (mask, values, conflict) para a matriz N x N de valores 0, 1
+    e 2 dada: 'mask' marca as posições vazias cujo valor é forçado pelas
+    regras locais, 'values' tem esse valor (uint8) e 'conflict' indica se
+    alguma posição vazia não pode ter nenhum dos valores."""
+    size = len(cells)
+    max_num_value = (size + 1) // 2
+    # Margem de 2 posições com um valor que nunca é igual a 0 ou 1
+    padded = np.pad(cells, 2, constant_values=3)
+    empty = cells == 2
+
+    # excluded[v]: posições que não podem ter o valor v
+    excluded = []
+    for value in (0, 1):
+        equal = padded == value
+        left1, left2 = equal[2:-2, 1:-3], equal[2:-2, :-4]
+        right1, right2 = equal[2:-2, 3:-1], equal[2:-2, 4:]
+        up1, up2 = equal[1:-3, 2:-2], equal[:-4, 2:-2]
+        down1, down2 = equal[3:-1, 2:-2], equal[4:, 2:-2]
+        #  -> tipo 0 2 0, (2) 0 0 2 e 2 0 0 (2), nos dois eixos
+        triples = ((left1 & left2) | (right1 & right2) | (left1 & right1) |
+                   (up1 & up2) | (down1 & down2) | (up1 & down1))
+        # -> linha/coluna que já tem o máximo de posições com o valor
+        full = equal[2:-2, 2:-2]
+        full_rows = full.sum(axis=1) >= max_num_value
+        full_cols = full.sum(axis=0) >= max_num_value
+        excluded.append(triples | full_rows[:, None] | full_cols[None, :])
+
+    force0 = empty & excluded[1]
+    force1 = empty & excluded[0]
+    return force0 | force1, force1.astype(np.uint8), bool((force0 & force1).any())
+
+
+def apply_forced_moves(board, trail=None) -> bool:
+    """Aplica ao tabuleiro, de cada vez, todas as posições forçadas por
+    forced_moves, até não haver mais. As posições preenchidas são
+    registadas em 'trail', se dado. Devolve False se encontrar uma
+    contradição."""
+    while True:
+        mask, values, conflict = forced_moves(board.to_array())
+        if conflict:
+            return False
+        cells = np.argwhere(mask)
+        if len(cells) == 0:
+            return board.is_consistent()
+        for row, col in cells.tolist():
+            board.set_number(row, col, int(values[row, col]))
+            if trail is not None:
+                trail.append((row, col))
+
+
+# -------------------------------- RAMIFICAÇÃO ---------------------------------
+# Políticas de escolha da posição onde ramificar: recebem um tabuleiro já
+# propagado e devolvem (linha, coluna) de uma posição livre, ou None se o
+# tabuleiro estiver completo. Usam as filas de LineCounters para não
+# percorrer o tabuleiro.
+
+def lowest_bit(mask: int) -> int:
+    """Devolve o índice do bit a 1 menos significativo."""
+    return (mask & -mask).bit_length() - 1
+
+
+def first_empty_cell(board):
+    """Primeira posição livre por ordem de leitura."""
+    size = int(board.size)
+    rows = ((1 << size) - 1) & ~board.get_counters().empties[0].buckets[0]
+    if not rows:
+        return None
+    i = lowest_bit(rows)
+    filled, _ = board.line_masks(0, i)
+    return i, lowest_bit(~filled)
+
+
+def cell_in_line(board, axis: int, k: int):
+    """Posição livre da linha/coluna k cuja coluna/linha tem menos
+    posições vazias."""
+    size = int(board.size)
+    filled, _ = board.line_masks(axis, k)
+    empty = ((1 << size) - 1) & ~filled
+    num_values = board.num_values_col if axis == 0 else board.num_values_row
+
+    best, best_empty = None, size + 1
+    while empty:
+        low = empty & -empty
+        empty ^= low
+        pos = low.bit_length() - 1
+        if num_values[pos][1] < best_empty:
+            best, best_empty = pos, num_values[pos][1]
+    return (k, best) if axis == 0 else (best, k)
+
+
+def most_constrained_line(board):
+    """Posição livre da linha ou coluna com menos posições vazias."""
+    counters = board.get_counters()
+    best = None
+    for axis in (0, 1):
+        lowest = counters.empties[axis].lowest(1)
+        if lowest is not None and (best is None or lowest[0] < best[0]):
+            best = (lowest[0], axis, lowest_bit(lowest[1]))
+    if best is None:
+        return None
+    return cell_in_line(board, best[1], best[2])
+
+
+def least_slack_line(board):
+    """Posição livre da linha ou coluna mais perto de esgotar um dos valores."""
+    counters = board.get_counters()
+    best = None
+    for axis in (0, 1):
+        lowest = counters.slacks[axis].lowest()
+        if lowest is None:
+            continue
+        k = lowest_bit(lowest[1])
+        # -> as linhas completas ficam no último balde: se a de menor folga
+        # está completa, estão todas
+        if (counters.status[axis][k][2] != 0 and
+                (best is None or lowest[0] < best[0])):
+            best = (lowest[0], axis, k)
+    if best is None:
+        return None
+    return cell_in_line(board, best[1], best[2])
+
 
-        return h
+def fewest_candidates_line(board):
+    """Posição livre da linha ou coluna com menos linhas candidatas (ver
+    takuzu_lines). Sem tabelas, usa a linha com menos posições vazias."""
+    if board.domains is None:
+        return most_constrained_line(board)
+    counters = board.get_counters()
+    size = counters.size
+    best = None
+    for axis in (0, 1):
+        incomplete = ((1 << size) - 1) & ~counters.empties[axis].buckets[0]
+        while incomplete:
+            low = incomplete & -incomplete
+            incomplete ^= low
+            k = low.bit_length() - 1
+            candidates = len(board.domains[axis][k])
+            if best is None or candidates < best[0]:
+                best = (candidates, axis, k)
+    if best is None:
+        return None
+    return cell_in_line(board, best[1], best[2])
+
+
+def most_propagating_cell(board):
+    """Posição sondada (ver probe_literals) em que os dois valores preenchem
+    mais posições, pelo produto das posições preenchidas por cada um. Sem
+    resultados de sondagem, usa a linha com menos posições vazias."""
+    best, best_score = None, -1
+    for (row, col), (zero, one) in (board.probes or {}).items():
+        score = (zero + 1) * (one + 1)
+        if score > best_score and board.get_number(row, col) == 2:
+            best, best_score = (row, col), score
+    if best is None:
+        return most_constrained_line(board)
+    return best
+
+
+BRANCHING = {
+    "first": first_empty_cell,
+    "line": most_constrained_line,
+    "balance": least_slack_line,
+    "domain": fewest_candidates_line,
+    "probe": most_propagating_cell,
+}
+
+
+# Ordem dos valores: devolve os dois valores pela ordem das ações. A procura
+# em profundidade explora primeiro a última ação da lista.
+
+def fixed_value_order(board, row: int, col: int):
+    """Ordem fixa (0 e depois 1), como nas ações originais."""
+    return (0, 1)
+
+
+def balance_value_order(board, row: int, col: int):
+    """Deixa em último (para ser explorado primeiro) o valor que ainda tem
+    mais lugares livres na linha e na coluna da posição."""
+    size = int(board.size)
+    max_num_value = (size + 1) // 2
+    room_zero = room_one = 0
+    for ones, empty in (board.num_values_row[row], board.num_values_col[col]):
+        room_one += max_num_value - ones
+        room_zero += max_num_value - (size - ones - empty)
+    return (1, 0) if room_zero > room_one else (0, 1)
+
+
+VALUE_ORDERS = {
+    "fixed": fixed_value_order,
+    "balance": balance_value_order,
+}
 
 
 # ------------------------------------ TAKUZU ---------------------------------
 class Takuzu(Problem):
     
-    def __init__(self, board):
-        """O construtor especifica o estado inicial."""
-        super().__init__(TakuzuState(board))
+    def __init__(self, board, propagate=True, line_tables=False,
+     branching="first", value_order="fixed", probe_budget=0):
+        """O construtor especifica o estado inicial. Se 'propagate' for
+        True, todos os estados são levados ao ponto fixo da propagação e
+        as ações são apenas as escolhas de ramificação; com "rules", o
+        ponto fixo é só o das regras locais, aplicadas a todo o tabuleiro
+        de uma vez (ver apply_forced_moves). Com 'line_tables',
+        a propagação filtra também as linhas válidas de cada linha/coluna
+        (quando a tabela do tamanho do tabuleiro não é demasiado grande).
+        'branching' e 'value_order' são nomes de BRANCHING/VALUE_ORDERS ou
+        funções com a mesma assinatura. Com 'probe_budget' > 0, depois da
+        propagação são sondadas até esse número de atribuições por estado
+        (ver probe_literals); conflict_directed_search não sonda.
+        'line_tables' e 'probe_budget' só podem ser usados com
+        propagate=True."""
+        if propagate is not True and (line_tables or probe_budget > 0):
+            raise ValueError("line_tables e probe_budget precisam da "
+                "propagação completa (propagate=True).")
         self.board = board
+        self.propagate = propagate
+        self.probe_budget = probe_budget
+        if isinstance(branching, str):
+            branching = BRANCHING[branching]
+        if isinstance(value_order, str):
+            value_order = VALUE_ORDERS[value_order]
+        self.branching = branching
+        self.value_order = value_order
+        if propagate:
+            board = board.copy()
+            if line_tables:
+                board.domains = line_domains(int(board.size))
+            initial = TakuzuState(board, self.propagate_board(board))
+        else:
+            initial = TakuzuState(board, board.is_consistent())
+        super().__init__(initial)
+
+    def propagate_board(self, board, dirty=None, trail=None) -> bool:
+        """Leva o tabuleiro ao ponto fixo da propagação (e da sondagem, se
+        houver orçamento). Devolve False se houver uma contradição."""
+        if self.propagate == "rules":
+            return apply_forced_moves(board, trail)
+        if (not propagate_constraints(board, dirty, trail) or
+                not board.is_consistent()):
+            return False
+        if self.probe_budget > 0:
+            return probe_literals(board, self.probe_budget, trail)
+        return True
 
-    def actions(self, state: TakuzuState): 
+    def actions(self, state: TakuzuState):
         """Retorna uma lista de ações que podem ser executadas a
         partir do estado passado como argumento."""
+        if not state.consistent:
+            return []
+
+        if not self.propagate:
+            return self.local_actions(state)
+
+        # Estado já propagado: só falta escolher onde ramificar
+        return self.branch_actions(state.board)
+
+    def branch_actions(self, board):
+        """Retorna as ações de ramificação na posição escolhida pela
+        política de ramificação (lista vazia se o tabuleiro estiver
+        completo)."""
+        cell = self.branching(board)
+        if cell is None:
+            return []
+        i, j = cell
+        return [(i, j, value) for value in self.value_order(board, i, j)]
+
+    def local_actions(self, state: TakuzuState):
+        """Retorna a primeira ação forçada encontrada pelas regras locais,
+        ou a ramificação na primeira posição livre se não houver nenhuma."""
 
         possible_actions = []
         state_board = state.board
@@ -190,7 +1247,7 @@ class Takuzu(Problem):
                 continue
 
             for j in range(size):
-                if state.board.matrix[i][j] == 2:
+                if state_board.get_number(i, j) == 2:
 
                     if (size % 2 == 0):
                         max_num_value = size // 2
@@ -213,12 +1270,12 @@ class Takuzu(Problem):
                         num = abs(horizontal[0] - 1)
                         return [(i, j, num)]
                     #  -> tipo (2) 0 0 2 (esquerda)
-                    if (j+2 < size and state_board.matrix[i][j+1] == state_board.matrix[i][j+2] != 2):
-                        num = abs(state_board.matrix[i][j+1] - 1)
+                    if (j+2 < size and state_board.get_number(i, j+1) == state_board.get_number(i, j+2) != 2):
+                        num = abs(state_board.get_number(i, j+1) - 1)
                         return [(i, j, num)]
                     #  -> tipo (2) 0 0 2 (direita)
-                    if (j >= 2 and state_board.matrix[i][j-2] == state_board.matrix[i][j-1] != 2):
-                        num = abs(state_board.matrix[i][j-1] - 1)
+                    if (j >= 2 and state_board.get_number(i, j-2) == state_board.get_number(i, j-1) != 2):
+                        num = abs(state_board.get_number(i, j-1) - 1)
                         return [(i, j, num)]
                 
                 # ----- Verticais: -----
@@ -228,12 +1285,12 @@ class Takuzu(Problem):
                         num = abs(vertical[0] - 1)
                         return [(i, j, num)]
                     #  -> tipo (2) 0 0 2 (baixo)
-                    if (i+2 < size and state_board.matrix[i+1][j] == state_board.matrix[i+2][j] != 2):
-                        num = abs(state_board.matrix[i+1][j] - 1)
+                    if (i+2 < size and state_board.get_number(i+1, j) == state_board.get_number(i+2, j) != 2):
+                        num = abs(state_board.get_number(i+1, j) - 1)
                         return [(i, j, num)]
                     #  -> tipo (2) 0 0 2 (cima)
-                    if (i >= 2 and state_board.matrix[i-2][j] == state_board.matrix[i-1][j] != 2):
-                        num = abs(state_board.matrix[i-1][j] - 1)
+                    if (i >= 2 and state_board.get_number(i-2, j) == state_board.get_number(i-1, j) != 2):
+                        num = abs(state_board.get_number(i-1, j) - 1)
                         return [(i, j, num)]
 
                 # Escolher a primeira posicao livre (caso não haja nenhuma escolha direta):
@@ -249,70 +1306,437 @@ class Takuzu(Problem):
         self.actions(state)."""
         board = state.board.get_board(action)
 
-        return TakuzuState(board)
+        if self.propagate:
+            i, j = action[0], action[1]
+            return TakuzuState(board, self.propagate_board(board, [(0, i), (1, j)]))
+        return TakuzuState(board, board.is_consistent())
 
     def goal_test(self, state: TakuzuState):
         """Retorna True se e só se o estado passado como argumento é
         um estado objetivo. Deve verificar se todas as posições do tabuleiro
         estão preenchidas com uma sequência de números adjacentes."""
-        
-        size = state.board.size
-        
-        # -> Alguma posição por preencher?
-        for k in range(size):
-            if (state.board.num_values_row[k][1] != 0 or
-                state.board.num_values_col[k][1] != 0):
-                return False
 
-        final_board_rows = state.board.matrix
-        final_board_cols = np.transpose(final_board_rows)
-
-        # -> Máx. 2 números iguais adjacentes (vertical e horizontal)?
-        # -> #0's = #1's por linha/coluna?
-        #       Soma de todas as posições por linha/coluna == size // 2
-        #       [Se N é ímpar, pode também ser == (size // 2) + 1]
-        sum_values_each = size // 2
-
-        for row in final_board_rows:
-            total = np.sum(row)
-            if (total == sum_values_each or (size % 2 != 0 and total == sum_values_each + 1)):
-                for i in range(2, size):
-                    if (row[i-2] == row[i-1] == row[i]):
-                        return False
-            else:
-                return False
-        
-        for col in final_board_cols:
-            total = np.sum(col)
-            if (total == sum_values_each or (size % 2 != 0 and total == sum_values_each + 1)):
-                for j in range(2, size):
-                    if (col[j-2] == col[j-1] == col[j]):
-                        return False
-            else:
-                return False
-        
-        # -> Linhas/colunas todas diferentes?
-        if (len(np.unique(final_board_rows, axis=0)) != size or
-            len(np.unique(final_board_cols, axis=0)) != size):
-            return False
-        
-        return True
+        return state.consistent and state.board.is_solved()
 
     def h(self, node: Node):
         """Função heuristica utilizada para a procura A*."""
         return node.state.board.heuristic()
 
 
+# ------------------------------ PROCURA COM TRILHO ---------------------------
+def undo_trail(board, trail: list, mark: int):
+    """Desfaz as alterações do trilho até este voltar a ter 'mark' entradas.
+    Cada entrada é uma posição preenchida (row, col), o domínio anterior
+    de uma linha/coluna (axis, k, domain) ou os resultados anteriores da
+    sondagem (probes,)."""
+    while len(trail) > mark:
+        entry = trail.pop()
+        if len(entry) == 2:
+            board.unset_number(*entry)
+        elif len(entry) == 1:
+            board.probes = entry[0]
+        else:
+            axis, k, domain = entry
+            board.domains[axis][k] = domain
+
+
+def trail_solutions(problem: Takuzu):
+    """Gera todas as soluções, uma de cada vez, pela ordem em que
+    depth_first_trail_search as encontra. Usa um único tabuleiro alterado
+    com um trilho (ver depth_first_trail_search) e devolve uma cópia de cada
+    tabuleiro final. Como a propagação só faz deduções forçadas e cada
+    ramificação separa os dois valores de uma posição, cada solução aparece
+    exatamente uma vez."""
+    if not problem.initial.consistent:
+        return
+
+    board = problem.initial.board.copy()
+    if board.is_solved():
+        yield board
+        return
+
+    trail = []
+    # Pilha de (tamanho do trilho no ponto de escolha, ação)
+    frontier = [(0, action) for action in problem.branch_actions(board)]
+
+    while frontier:
+        mark, (i, j, value) = frontier.pop()
+        undo_trail(board, trail, mark)
+
+        board.set_number(i, j, value)
+        trail.append((i, j))
+        if problem.propagate:
+            consistent = problem.propagate_board(board, [(0, i), (1, j)], trail)
+        else:
+            consistent = board.is_consistent()
+        if not consistent:
+            continue
+        if board.is_solved():
+            yield board.copy()
+            continue
+
+        mark = len(trail)
+        frontier.extend((mark, action) for action in problem.branch_actions(board))
+
+
+def depth_first_trail_search(problem: Takuzu):
+    """Procura em profundidade que altera um único tabuleiro em vez de
+    copiar um por nó. Cada atribuição (escolhida ou propagada) é registada
+    num trilho e desfeita ao retroceder, pelo que a memória não cresce com a
+    profundidade. Explora as ações pela mesma ordem que
+    depth_first_tree_search e devolve um Node com o estado final."""
+    for board in trail_solutions(problem):
+        return Node(TakuzuState(board))
+    return None
+
+
+# ------------------------ RETROCESSO DIRIGIDO POR CONFLITOS -------------------
+# As decisões da procura são numeradas por nível (1, 2, ...) e um conjunto de
+# decisões é guardado como uma máscara de bits (bit d = decisão do nível d).
+# As posições preenchidas antes da procura dependem só das pistas (máscara 0).
+
+class ConflictReasons:
+    """Regista, para cada posição preenchida durante a procura, a máscara
+    das decisões de que depende, e para cada linha/coluna a união das
+    máscaras das suas posições. 'conflict' fica com as decisões que causaram
+    a última contradição encontrada por propagate_constraints."""
+
+    def __init__(self, size: int):
+        self.cell = [[0]*size for _ in range(size)]
+        self.line = [[0]*size, [0]*size]
+        self.saved = []     # máscaras anteriores das linhas, por atribuição
+        self.conflict = 0
+
+    def assign(self, row: int, col: int, reason: int):
+        """Regista a razão de uma posição acabada de preencher."""
+        self.cell[row][col] = reason
+        self.saved.append((self.line[0][row], self.line[1][col]))
+        self.line[0][row] |= reason
+        self.line[1][col] |= reason
+
+    def unassign(self, row: int, col: int):
+        """Desfaz o último assign (que tem de ser o desta posição)."""
+        self.line[0][row], self.line[1][col] = self.saved.pop()
+
+    def complete_lines(self, board, axis: int) -> int:
+        """Decisões de que dependem as linhas/colunas completas do eixo."""
+        complete = board.get_counters().empties[axis].buckets[0]
+        reason = 0
+        while complete:
+            low = complete & -complete
+            complete ^= low
+            reason |= self.line[axis][low.bit_length() - 1]
+        return reason
+
+
+class Nogoods:
+    """Conjuntos de atribuições (row, col, value) que já se sabe não terem
+    solução, indexados por cada uma das suas atribuições."""
+
+    def __init__(self, max_size: int, max_count: int):
+        self.max_size = max_size
+        self.max_count = max_count
+        self.count = 0
+        self.index = {}
+
+    def add(self, literals: tuple):
+        """Guarda um nogood (se não for demasiado grande nem houver já
+        demasiados)."""
+        if not literals or len(literals) > self.max_size or self.count >= self.max_count:
+            return
+        self.count += 1
+        for literal in literals:
+            self.index.setdefault(literal, []).append(literals)
+
+    def violated(self, board, cells):
+        """Devolve um nogood cujas atribuições estejam todas feitas no
+        tabuleiro e que inclua uma das posições 'cells', ou None."""
+        if not self.index:
+            return None
+        for row, col in cells:
+            for literals in self.index.get((row, col, board.get_number(row, col)), ()):
+                if all(board.get_number(i, j) == value for i, j, value in literals):
+                    return literals
+        return None
+
+
+def conflict_directed_search(problem: Takuzu, max_nogood_size: int = 12,
+ max_nogoods: int = 100000):
+    """Procura em profundidade com trilho (como depth_first_trail_search)
+    que, quando todos os valores de uma decisão falham, salta diretamente
+    para a decisão mais recente responsável pelas contradições em vez da
+    anterior, e guarda as decisões responsáveis como nogood para não voltar
+    a repetir essa combinação noutro ramo. Devolve um Node com o estado
+    final, ou None. Os culpados vêm da propagação completa, pelo que o
+    problema tem de ter propagate=True."""
+    if problem.propagate is not True:
+        raise ValueError("conflict_directed_search precisa da propagação "
+            "completa (propagate=True).")
+    if not problem.initial.consistent:
+        return None
+
+    board = problem.initial.board.copy()
+    if board.is_solved():
+        return Node(TakuzuState(board))
+
+    size = int(board.size)
+    reasons = ConflictReasons(size)
+    nogoods = Nogoods(max_nogood_size, max_nogoods)
+    trail = []
+
+    def undo(mark):
+        while len(trail) > mark:
+            entry = trail.pop()
+            if len(entry) == 2:
+                board.unset_number(*entry)
+                reasons.unassign(*entry)
+            else:
+                axis, k, domain = entry
+                board.domains[axis][k] = domain
+
+    # Por nível: [row, col, valores por tentar, tamanho do trilho antes da
+    # decisão, decisões anteriores culpadas pelas falhas deste nível]
+    levels = []
+
+    def new_level():
+        actions = problem.branch_actions(board)
+        row, col = actions[0][0], actions[0][1]
+        levels.append([row, col, [action[2] for action in actions], len(trail), 0])
+
+    new_level()
+    while levels:
+        d = len(levels)
+        row, col, values, mark, culprits = levels[-1]
+
+        if not values:
+            # Nenhum valor serve: as decisões culpadas formam um nogood, e a
+            # procura continua no nível culpado mais recente
+            nogoods.add(tuple((levels[l-1][0], levels[l-1][1],
+                board.get_number(levels[l-1][0], levels[l-1][1]))
+                for l in range(1, d) if culprits >> l & 1))
+            if not culprits:
+                return None
+            back = culprits.bit_length() - 1
+            del levels[back:]
+            levels[-1][4] |= culprits & ~(1 << back)
+            continue
+
+        value = values.pop()
+        undo(mark)
+        board.set_number(row, col, value)
+        trail.append((row, col))
+        reasons.assign(row, col, 1 << d)
+
+        consistent = propagate_constraints(board, [(0, row), (1, col)], trail, reasons)
+        if consistent:
+            cells = [entry for entry in trail[mark:] if len(entry) == 2]
+            literals = nogoods.violated(board, cells)
+            if literals is not None:
+                consistent = False
+                reasons.conflict = 0
+                for i, j, _ in literals:
+                    reasons.conflict |= reasons.cell[i][j]
+        if consistent and not board.is_consistent():
+            consistent = False
+            reasons.conflict = (1 << (d + 1)) - 2
+        if not consistent:
+            levels[-1][4] |= reasons.conflict & ~(1 << d)
+            if not reasons.conflict >> d & 1:
+                # A contradição não depende desta decisão: os outros valores
+                # falhariam da mesma forma
+                values.clear()
+            continue
+
+        if board.is_solved():
+            return Node(TakuzuState(board))
+        new_level()
+
+    return None
+
+
+# ------------------------------------- SAT ------------------------------------
+def sat_search(problem: Takuzu):
+    """Resolve o tabuleiro inicial (já propagado) traduzindo-o para CNF e
+    usando o resolvedor CDCL de takuzu_sat, pelo que não depende da ordem
+    das regras nem da política de ramificação. Devolve um Node com o
+    estado final, ou None."""
+    if not problem.initial.consistent:
+        return None
+
+    board = problem.initial.board.copy()
+    if not board.is_solved():
+        actions = solve_board(board)
+        if actions is None:
+            return None
+        for i, j, value in actions:
+            board.set_number(i, j, value)
+    return Node(TakuzuState(board))
+
+
+# ----------------------------- LINHA A LINHA (PD) -----------------------------
+# Trabalho da PD de row_dp_search (ver takuzu_dp.RowDP) antes de desistir e
+# passar para depth_first_trail_search (cerca de meio segundo)
+ROW_DP_MAX_WORK = 300000
+
+
+def row_dp_solutions(problem: Takuzu, max_work: int = None):
+    """Gera todas as soluções do tabuleiro inicial (já propagado), como
+    trail_solutions, escolhendo uma linha inteira de cada vez com os estados
+    das colunas memorizados (ver takuzu_dp). A enumeração é exata; com
+    'max_work', levanta WorkLimit quando o trabalho da PD passar esse
+    valor."""
+    if not problem.initial.consistent:
+        return
+
+    board = problem.initial.board
+    if board.is_solved():
+        yield board.copy()
+        return
+    for actions in row_solutions(board, max_work):
+        solution = board.copy()
+        for i, j, value in actions:
+            solution.set_number(i, j, value)
+        yield solution
+
+
+def row_dp_search(problem: Takuzu, max_work: int = ROW_DP_MAX_WORK):
+    """Resolve o tabuleiro com row_dp_solutions. Se a PD exceder 'max_work'
+    (nos tabuleiros grandes e esparsos, ver takuzu_dp), continua com
+    depth_first_trail_search. Devolve um Node com o estado final, ou
+    None."""
+    try:
+        for board in row_dp_solutions(problem, max_work):
+            return Node(TakuzuState(board))
+        return None
+    except WorkLimit:
+        return depth_first_trail_search(problem)
+
+
+# Representações de tabuleiro disponíveis (para comparar o desempenho)
+BOARDS = {
+    "numpy": Board,
+    "bits": BitBoard,
+}
+
+# Procuras disponíveis na linha de comandos. O Takuzu só precisa do tabuleiro
+# final, pelo que os nós não guardam o caminho desde a raiz e os tabuleiros
+# dos antepassados podem ser libertados.
+SEARCHES = {
+    "dfs": functools.partial(depth_first_tree_search, path="none"),
+    "astar": functools.partial(astar_search, path="none"),
+    "greedy": functools.partial(greedy_search, path="none"),
+    "trail": depth_first_trail_search,
+    "cbj": conflict_directed_search,
+    "sat": sat_search,
+    "rows": row_dp_search,
+}
+
+
+def solve(board, search="dfs", **options):
+    """Resolve o tabuleiro com a procura 'search' (nome de SEARCHES) e as
+    opções de Takuzu dadas. Devolve o tabuleiro final, ou None."""
+    goal_node = SEARCHES[search](Takuzu(board, **options))
+    if goal_node is None:
+        return None
+    return goal_node.state.board
+
+
+# Enumerações de todas as soluções: nome -> gerador de tabuleiros resolvidos
+SOLUTIONS = {
+    "trail": trail_solutions,
+    "rows": row_dp_solutions,
+}
+
+
+def iter_solutions(board, search="trail", **options):
+    """Gera as soluções do tabuleiro à medida que são encontradas, com a
+    enumeração 'search' (nome de SOLUTIONS) e as mesmas opções de Takuzu
+    que solve."""
+    return SOLUTIONS[search](Takuzu(board, **options))
+
+
+def count_solutions(board, limit=None, search="trail", **options) -> int:
+    """Conta as soluções do tabuleiro, parando assim que encontrar 'limit'
+    (None conta todas)."""
+    solutions = iter_solutions(board, search, **options)
+    return sum(1 for _ in itertools.islice(solutions, limit))
+
+
+def has_unique_solution(board, search="trail", **options) -> bool:
+    """Verifica se o tabuleiro tem exatamente uma solução (basta procurar
+    até encontrar duas)."""
+    return count_solutions(board, 2, search, **options) == 1
+
+
+def add_solver_arguments(parser):
+    """Acrescenta a um ArgumentParser as opções que escolhem o resolvedor."""
+    parser.add_argument("--board", choices=BOARDS, default="numpy",
+        help="representação interna do tabuleiro")
+    parser.add_argument("--search", choices=SEARCHES, default="dfs",
+        help="técnica de procura")
+    parser.add_argument("--lines", action="store_true",
+        help="propagar também com as tabelas de linhas válidas")
+    parser.add_argument("--branching", choices=BRANCHING, default="first",
+        help="escolha da posição onde ramificar")
+    parser.add_argument("--value-order", choices=VALUE_ORDERS, default="fixed",
+        help="ordem pela qual os valores são tentados")
+    parser.add_argument("--probe-budget", type=int, default=0,
+        help="atribuições sondadas por estado antes de ramificar (0 desliga)")
+    parser.add_argument("--rules", action="store_true",
+        help="propagar só com as regras locais vetorizadas")
+
+
+def check_solver_arguments(parser, args):
+    """Termina com parser.error se as opções de add_solver_arguments não
+    puderem ser usadas em conjunto: com --rules não há propagação completa,
+    de que precisam --search cbj, --lines e --probe-budget."""
+    if args.rules:
+        for given, option in ((args.search == "cbj", "--search cbj"),
+                              (args.lines, "--lines"),
+                              (args.probe_budget > 0, "--probe-budget")):
+            if given:
+                parser.error("--rules não pode ser usado com {}, que precisa "
+                    "da propagação completa".format(option))
+    if args.probe_budget < 0:
+        parser.error("--probe-budget não pode ser negativo")
+
+
+def solver_options(args):
+    """Devolve as opções de Takuzu escolhidas com add_solver_arguments."""
+    return {"propagate": "rules" if args.rules else True,
+            "line_tables": args.lines, "branching": args.branching,
+            "value_order": args.value_order, "probe_budget": args.probe_budget}
+
+
 if __name__ == "__main__":
     # Ler o ficheiro de input de sys.argv[1],
     # Usar uma técnica de procura para resolver a instância,
     # Retirar a solução a partir do nó resultante,
     # Imprimir para o standard output no formato indicado.
 
-    board = Board.parse_instance_from_stdin()
-    problem = Takuzu(board)
-    goal_node = depth_first_tree_search(problem) 
-    #goal_node = astar_search(problem)
-    print(goal_node.state.board, sep="")
+    parser = argparse.ArgumentParser(description="Resolve as instâncias de "
+        "Takuzu lidas do stdin (uma ou várias seguidas).")
+    add_solver_arguments(parser)
+    parser.add_argument("--count", action="store_true",
+        help="escrever o número de soluções em vez de uma solução (com "
+        "--search rows, contadas pela PD linha a linha; com as outras "
+        "procuras, pela procura com trilho)")
+    parser.add_argument("--limit", type=int, default=None,
+        help="com --count, parar ao fim de LIMIT soluções")
+    args = parser.parse_args()
+    check_solver_arguments(parser, args)
+
+    # Várias instâncias são resolvidas no mesmo processo; as soluções são
+    # separadas por uma linha vazia
+    for index, board in enumerate(iter_boards(stdin, BOARDS[args.board])):
+        if args.count:
+            search = args.search if args.search in SOLUTIONS else "trail"
+            print(count_solutions(board, args.limit, search,
+                **solver_options(args)))
+            continue
+        if index > 0:
+            print()
+        solution = solve(board, args.search, **solver_options(args))
+        print(solution, sep="", flush=True)
 
     pass
@@ -0,0 +1,207 @@
+# takuzu_batch.py: Resolução de muitas instâncias de Takuzu em paralelo.
+# As instâncias podem vir de uma diretoria (por exemplo testes-takuzu/, onde
+# são usados os ficheiros input_*), de um padrão glob, de ficheiros ou do
+# stdin, e cada ficheiro pode conter várias instâncias seguidas no formato de
+# Board.parse_instance_from_stdin (ou no formato binário de takuzu_corpus).
+# As soluções são escritas no formato de Board.__str__, pela ordem de entrada
+# ou pela ordem em que ficam prontas.
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import glob
+import os
+import signal
+import sys
+import time
+
+from takuzu import (BOARDS, add_solver_arguments, check_solver_arguments,
+                    iter_cells, solve, solver_options)
+from takuzu_corpus import Corpus, is_corpus
+
+# Resultado da resolução de uma instância: 'solution' é o texto do tabuleiro
+# resolvido, ou None se 'error' descrever a falha ("timeout", "no solution",
+# ou a exceção levantada).
+BatchResult = collections.namedtuple("BatchResult",
+    ["index", "name", "solution", "error", "seconds"])
+
+
+class SolverTimeout(Exception):
+    """Levantada dentro de um processo quando uma instância excede o tempo."""
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    """Interrompe o bloco com SolverTimeout ao fim de 'seconds' segundos.
+    Usa SIGALRM, pelo que só tem efeito em sistemas Unix."""
+    if not seconds or not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def handler(signum, frame):
+        raise SolverTimeout()
+
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def expand_sources(sources):
+    """Devolve a lista de ficheiros correspondentes às fontes dadas:
+    diretorias (os seus ficheiros input_*, ou todos se não houver nenhum),
+    padrões glob ou ficheiros. '-' representa o stdin."""
+    paths = []
+    for source in sources:
+        if source == "-":
+            paths.append(source)
+        elif os.path.isdir(source):
+            files = sorted(glob.glob(os.path.join(source, "input_*")))
+            if not files:
+                files = sorted(path for path in glob.glob(os.path.join(source, "*"))
+                               if os.path.isfile(path))
+            paths.extend(files)
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source)))
+        else:
+            paths.append(source)
+    return paths
+
+
+def iter_instances(sources):
+    """Gera (nome, matriz de valores) de cada instância das fontes dadas (ver
+    takuzu.iter_cells), lendo cada ficheiro à medida que é preciso. Um
+    ficheiro com várias instâncias dá os nomes 'ficheiro#1', 'ficheiro#2',
+    ..."""
+    for path in expand_sources(sources or ["-"]):
+        if path == "-":
+            name, stream = "stdin", sys.stdin
+        elif is_corpus(path):
+            # Ficheiro binário (takuzu_corpus): cada tabuleiro é lido do mmap
+            with Corpus(path) as corpus:
+                for k, cells in enumerate(corpus, 1):
+                    yield "{}#{}".format(path, k), cells
+            continue
+        else:
+            name, stream = path, open(path)
+
+        with contextlib.ExitStack() as stack:
+            if stream is not sys.stdin:
+                stack.enter_context(stream)
+            instances = iter_cells(stream)
+            first = next(instances, None)
+            if first is None:
+                continue
+            second = next(instances, None)
+            if second is None:
+                yield name, first
+                continue
+
+            yield "{}#1".format(name), first
+            yield "{}#2".format(name), second
+            for k, cells in enumerate(instances, 3):
+                yield "{}#{}".format(name, k), cells
+
+
+def solve_instance(index, name, cells, board, search, options, timeout):
+    """Resolve uma instância dada pela matriz de valores (corre num
+    processo do pool)."""
+    start = time.perf_counter()
+    try:
+        with time_limit(timeout):
+            solution = solve(BOARDS[board].from_cells(cells), search, **options)
+    except SolverTimeout:
+        return BatchResult(index, name, None, "timeout",
+            time.perf_counter() - start)
+    except Exception as error:
+        return BatchResult(index, name, None, repr(error),
+            time.perf_counter() - start)
+
+    if solution is None:
+        return BatchResult(index, name, None, "no solution",
+            time.perf_counter() - start)
+    return BatchResult(index, name, str(solution), None,
+        time.perf_counter() - start)
+
+
+def solve_batch(instances, workers=None, order="input", timeout=None,
+ board="numpy", search="dfs", options=None):
+    """Resolve as instâncias (pares (nome, matriz de valores)) num pool de 'workers'
+    processos e gera um BatchResult por instância, pela ordem de entrada
+    (order = "input") ou pela ordem em que terminam (order = "completion").
+    Só são lidas do iterador as instâncias necessárias para manter os
+    processos ocupados."""
+    options = options or {}
+    workers = workers or os.cpu_count() or 1
+    window = 4 * workers
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        instances = enumerate(instances)
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    index, (name, cells) = next(instances)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append(pool.submit(solve_instance, index, name, cells,
+                    board, search, options, timeout))
+            if not pending:
+                return
+
+            if order == "input":
+                yield pending.popleft().result()
+            else:
+                done, _ = concurrent.futures.wait(pending,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+
+
+def write_result(result, out=sys.stdout):
+    """Escreve um resultado: uma linha '# nome' seguida do tabuleiro
+    resolvido, ou '# nome: FAILED (motivo)'."""
+    if result.solution is None:
+        out.write("# {}: FAILED ({})\n".format(result.name, result.error))
+    else:
+        out.write("# {}\n{}\n".format(result.name, result.solution))
+    out.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Resolve em paralelo muitas instâncias de Takuzu.")
+    parser.add_argument("sources", nargs="*",
+        help="diretorias, padrões glob ou ficheiros ('-' ou nada: stdin)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+        help="número de processos (por omissão, um por CPU)")
+    parser.add_argument("--order", choices=("input", "completion"),
+        default="input", help="ordem pela qual as soluções são escritas")
+    parser.add_argument("--timeout", type=float, default=None,
+        help="tempo máximo por instância, em segundos")
+    add_solver_arguments(parser)
+    args = parser.parse_args()
+    check_solver_arguments(parser, args)
+
+    failures = 0
+    results = solve_batch(iter_instances(args.sources), args.workers,
+        args.order, args.timeout, args.board, args.search, solver_options(args))
+    for result in results:
+        write_result(result)
+        if result.solution is None:
+            failures += 1
+            print("{}: {}".format(result.name, result.error), file=sys.stderr)
+
+    sys.exit(1 if failures else 0)
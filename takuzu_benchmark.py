@@ -0,0 +1,308 @@
+# takuzu_benchmark.py: Medição do desempenho das procuras do Takuzu.
+# Resolve cada input_T* de uma diretoria (por omissão testes-takuzu/) com
+# cada estratégia, regista o tempo, os nós gerados e expandidos, o pico de
+# memória e se a solução coincide com o output_T* correspondente, e guarda
+# tudo num ficheiro JSON. Dois ficheiros de resultados podem depois ser
+# comparados para detetar regressões. O comando memory mede quanto ocupa
+# cada nó da árvore de procura (Node + TakuzuState).
+#
+#   python takuzu_benchmark.py run -o novo.json
+#   python takuzu_benchmark.py compare antigo.json novo.json --threshold 0.2
+#   python takuzu_benchmark.py memory --count 100000
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from search import InstrumentedProblem, Node
+from takuzu import BOARDS, SEARCHES, Takuzu, TakuzuState
+from takuzu_batch import SolverTimeout, time_limit
+
+# Estratégias medidas: nome -> (procura de SEARCHES, opções de Takuzu)
+STRATEGIES = {
+    "dfs": ("dfs", {}),
+    # Referência sem propagação: só as regras locais de local_actions
+    "dfs-local": ("dfs", {"propagate": False}),
+    "astar": ("astar", {}),
+    "greedy": ("greedy", {}),
+    "trail": ("trail", {}),
+    "trail-line": ("trail", {"branching": "line"}),
+    "trail-tables": ("trail", {"line_tables": True, "branching": "domain"}),
+    "trail-probe": ("trail", {"probe_budget": 400, "branching": "probe"}),
+    "trail-line-balance": ("trail", {"branching": "line",
+                                     "value_order": "balance"}),
+    "trail-rules": ("trail", {"propagate": "rules"}),
+    "cbj": ("cbj", {}),
+    "cbj-line": ("cbj", {"branching": "line"}),
+    "sat": ("sat", {}),
+    "rows": ("rows", {}),
+}
+
+# Procuras que não ramificam através do Problem (o SAT e a PD linha a linha):
+# os nós gerados/expandidos ficam None, e não 0, quando não contaram nada
+UNCOUNTED_SEARCHES = {"sat", "rows"}
+
+
+class InstrumentedTakuzu(InstrumentedProblem):
+    """InstrumentedProblem que conta também as ramificações pedidas
+    diretamente pelas procuras que não usam actions/result (como
+    depth_first_trail_search): cada chamada é um nó expandido e cada
+    ação devolvida um nó gerado."""
+
+    def branch_actions(self, board):
+        self.succs += 1
+        actions = self.problem.branch_actions(board)
+        self.states += len(actions)
+        return actions
+
+
+def load_board(path, board="numpy"):
+    """Lê uma instância de um ficheiro."""
+    with open(path) as stream:
+        return BOARDS[board].parse_instance(stream)
+
+
+def expected_output(path):
+    """Devolve o conteúdo do output_T* correspondente a um input_T*,
+    ou None se não existir."""
+    directory, name = os.path.split(path)
+    output = os.path.join(directory, name.replace("input", "output", 1))
+    if output == path or not os.path.exists(output):
+        return None
+    with open(output) as stream:
+        return stream.read().strip()
+
+
+def run_once(path, strategy, board="numpy", timeout=None, memory=True):
+    """Resolve uma instância com uma estratégia e devolve o registo
+    (dicionário) com as medições."""
+    search, options = STRATEGIES[strategy]
+    record = {"instance": os.path.basename(path), "strategy": strategy,
+              "board": board, "seconds": None, "generated": None,
+              "expanded": None, "peak_kib": None, "solved": False,
+              "correct": None, "error": None}
+
+    board_instance = load_board(path, board)
+    start = time.perf_counter()
+    try:
+        with time_limit(timeout):
+            # A propagação inicial é feita no construtor e também conta
+            problem = InstrumentedTakuzu(Takuzu(board_instance, **options))
+            goal_node = SEARCHES[search](problem)
+    except SolverTimeout:
+        record["error"] = "timeout"
+        return record
+    record["seconds"] = time.perf_counter() - start
+    if problem.succs or search not in UNCOUNTED_SEARCHES:
+        record["generated"] = problem.states
+        record["expanded"] = problem.succs
+
+    if goal_node is None:
+        record["error"] = "no solution"
+        return record
+    solution = goal_node.state.board
+    record["solved"] = bool(solution.is_solved())
+    expected = expected_output(path)
+    if expected is not None:
+        record["correct"] = str(solution).strip() == expected
+
+    if memory:
+        # Segunda execução só para a memória: o tracemalloc atrasa a procura,
+        # pelo que pode exceder o tempo mesmo que a primeira não tenha
+        board_instance = load_board(path, board)
+        tracemalloc.start()
+        try:
+            with time_limit(timeout):
+                SEARCHES[search](Takuzu(board_instance, **options))
+            record["peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+        except SolverTimeout:
+            pass
+        finally:
+            tracemalloc.stop()
+
+    return record
+
+
+def run_benchmark(paths, strategies, board="numpy", timeout=None,
+ memory=True, log=sys.stderr):
+    """Corre todas as estratégias em todas as instâncias e devolve os
+    resultados no formato guardado em JSON."""
+    results = []
+    # Coluna das estratégias com a largura do nome mais comprido
+    width = max(map(len, strategies), default=0)
+    for path in paths:
+        for strategy in strategies:
+            record = run_once(path, strategy, board, timeout, memory)
+            results.append(record)
+            if log is not None:
+                seconds = record["seconds"]
+                print("{:14} {:{}} {:>10} {:>8} {}".format(record["instance"],
+                    strategy, width, "-" if seconds is None else "{:.4f}".format(seconds),
+                    "-" if record["expanded"] is None else record["expanded"],
+                    record["error"] or ("ok" if record["correct"] is not False
+                                        else "wrong")), file=log)
+
+    return {"meta": {"python": platform.python_version(),
+                     "platform": platform.platform(),
+                     "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                     "board": board, "timeout": timeout},
+            "results": results}
+
+
+def compare_results(old, new, threshold=0.2, min_seconds=0.01):
+    """Compara dois resultados de run_benchmark e devolve a lista de
+    regressões (strings): estratégias que deixaram de resolver ou de
+    acertar, ou cujo tempo ou nós expandidos aumentaram mais do que
+    'threshold' (tempos abaixo de 'min_seconds' são ignorados)."""
+    old_records = {(r["instance"], r["strategy"]): r for r in old["results"]}
+    regressions = []
+
+    for record in new["results"]:
+        key = (record["instance"], record["strategy"])
+        before = old_records.get(key)
+        if before is None:
+            continue
+        label = "{} {}".format(*key)
+
+        if before["solved"] and not record["solved"]:
+            regressions.append("{}: no longer solved ({})".format(label, record["error"]))
+            continue
+        if before["correct"] and record["correct"] is False:
+            regressions.append("{}: wrong solution".format(label))
+
+        old_time, new_time = before["seconds"], record["seconds"]
+        if (old_time is not None and new_time is not None and
+                max(old_time, new_time) >= min_seconds and
+                new_time > old_time * (1 + threshold)):
+            regressions.append("{}: time {:.4f}s -> {:.4f}s (+{:.0%})".format(
+                label, old_time, new_time, new_time / max(old_time, 1e-9) - 1))
+
+        old_nodes, new_nodes = before["expanded"], record["expanded"]
+        if (old_nodes is not None and new_nodes is not None and
+                new_nodes > old_nodes * (1 + threshold)):
+            regressions.append("{}: expanded {} -> {}".format(
+                label, old_nodes, new_nodes))
+
+    return regressions
+
+
+class DictNode:
+    """Node e TakuzuState como eram antes de usarem __slots__ (atributos
+    num __dict__), só para comparar a memória."""
+    def __init__(self, state, parent=None, action=None, path_cost=0):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.path_cost = path_cost
+        self.depth = 0
+        if parent:
+            self.depth = parent.depth + 1
+
+
+class DictState:
+    def __init__(self, board, consistent=True):
+        self.board = board
+        self.consistent = consistent
+        self.id = 0
+
+
+def node_bytes(node_class, state_class, board, count=100000):
+    """Bytes por nó (nó + estado, com f e h preenchidos como pelo memoize
+    de best_first_graph_search) de uma cadeia de 'count' nós que
+    partilham o mesmo tabuleiro, medidos com o tracemalloc."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        node = None
+        for k in range(count):
+            node = node_class(state_class(board), node, (0, 0, k & 1), k)
+            setattr(node, "h", k)
+            setattr(node, "f", k + k)
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return used / count
+
+
+def memory_report(board, count=100000):
+    """Devolve {"dict": bytes, "slots": bytes} por nó."""
+    return {"dict": node_bytes(DictNode, DictState, board, count),
+            "slots": node_bytes(Node, TakuzuState, board, count)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das procuras do Takuzu.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="correr o benchmark")
+    run.add_argument("instances", nargs="*", default=["testes-takuzu"],
+        help="diretorias (usa os input_T*), padrões glob ou ficheiros")
+    run.add_argument("-s", "--strategies", nargs="+", choices=STRATEGIES,
+        default=list(STRATEGIES), help="estratégias a medir")
+    run.add_argument("--board", choices=BOARDS, default="numpy",
+        help="representação interna do tabuleiro")
+    run.add_argument("--timeout", type=float, default=None,
+        help="tempo máximo por execução, em segundos")
+    run.add_argument("--no-memory", action="store_true",
+        help="não medir o pico de memória")
+    run.add_argument("-o", "--output", default=None,
+        help="ficheiro JSON de resultados (por omissão, stdout)")
+
+    compare = commands.add_parser("compare", help="comparar dois resultados")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.2,
+        help="aumento relativo a partir do qual há regressão")
+    compare.add_argument("--min-seconds", type=float, default=0.01,
+        help="tempos abaixo disto não contam como regressão")
+
+    memory = commands.add_parser("memory", help="memória por nó da procura")
+    memory.add_argument("instance", nargs="?",
+        default=os.path.join("testes-takuzu", "input_T01"),
+        help="instância cujo tabuleiro os nós partilham")
+    memory.add_argument("--count", type=int, default=100000,
+        help="número de nós criados")
+
+    args = parser.parse_args()
+
+    if args.command == "memory":
+        report = memory_report(load_board(args.instance), args.count)
+        for name, per_node in report.items():
+            print("{:6} {:8.1f} bytes/nó".format(name, per_node))
+        print("poupança {:.0%}".format(1 - report["slots"] / report["dict"]))
+    elif args.command == "run":
+        paths = []
+        for source in args.instances:
+            if os.path.isdir(source):
+                paths.extend(sorted(glob.glob(os.path.join(source, "input_T*"))))
+            elif glob.has_magic(source):
+                paths.extend(sorted(glob.glob(source)))
+            else:
+                paths.append(source)
+
+        report = run_benchmark(paths, args.strategies, args.board,
+            args.timeout, not args.no_memory)
+        if args.output is None:
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.output, "w") as stream:
+                json.dump(report, stream, indent=2)
+    else:
+        with open(args.old) as stream:
+            old = json.load(stream)
+        with open(args.new) as stream:
+            new = json.load(stream)
+        regressions = compare_results(old, new, args.threshold, args.min_seconds)
+        for regression in regressions:
+            print(regression)
+        sys.exit(1 if regressions else 0)
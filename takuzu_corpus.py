@@ -0,0 +1,193 @@
+# takuzu_corpus.py: Formato binário compacto para coleções de tabuleiros.
+# Cada tabuleiro (instância ou solução) é guardado com 2 bits por posição
+# (0, 1 ou 2 = vazia), quatro posições por byte, em vez dos ~2 bytes por
+# posição do formato de texto. O ficheiro tem:
+#
+#   cabeçalho  "TKZC", versão (u16), reservado (u16), número de tabuleiros
+#              (u64) e posição do índice (u64), em little-endian;
+#   registos   para cada tabuleiro, N (u16) seguido das posições empacotadas
+#              linha a linha (ceil(N*N / 4) bytes);
+#   índice     a posição de cada registo (u64), no fim do ficheiro.
+#
+# O ficheiro é lido através de mmap, pelo que aceder ao tabuleiro k não lê
+# o resto do ficheiro.
+#
+#   python takuzu_corpus.py pack testes-takuzu/input_T* -o testes.tkz
+#   python takuzu_corpus.py unpack testes.tkz
+#   python takuzu_corpus.py get testes.tkz 3
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import argparse
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+from takuzu import BOARDS, Board, iter_cells
+
+MAGIC = b"TKZC"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+RECORD = struct.Struct("<H")
+
+
+def pack_cells(cells: np.ndarray) -> bytes:
+    """Empacota uma matriz N x N de valores 0, 1 e 2 (ver
+    takuzu.parse_cells) com 2 bits por posição."""
+    flat = np.asarray(cells, dtype=np.uint8).ravel()
+    flat = np.concatenate([flat, np.zeros(-len(flat) % 4, dtype=np.uint8)])
+    quads = flat.reshape(-1, 4)
+    packed = quads[:, 0] | quads[:, 1] << 2 | quads[:, 2] << 4 | quads[:, 3] << 6
+    return packed.astype(np.uint8).tobytes()
+
+
+def unpack_cells(data, size: int) -> np.ndarray:
+    """Inverso de pack_cells: devolve a matriz N x N (uint8)."""
+    packed = np.frombuffer(data, dtype=np.uint8)
+    quads = np.stack([packed, packed >> 2, packed >> 4, packed >> 6], axis=1) & 3
+    return quads.ravel()[:size * size].reshape(size, size)
+
+
+def packed_size(size: int) -> int:
+    """Número de bytes das posições empacotadas de um tabuleiro N x N."""
+    return (size * size + 3) // 4
+
+
+def write_corpus(path: str, boards) -> int:
+    """Escreve num ficheiro os tabuleiros dados (matrizes de valores, Board
+    ou BitBoard) e devolve quantos foram escritos. Os tabuleiros são lidos
+    do iterador à medida que são escritos."""
+    offsets = []
+    with open(path, "wb") as stream:
+        stream.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        for board in boards:
+            cells = board if isinstance(board, np.ndarray) else board.to_array()
+            offsets.append(stream.tell())
+            stream.write(RECORD.pack(len(cells)))
+            stream.write(pack_cells(cells))
+
+        index = stream.tell()
+        stream.write(np.array(offsets, dtype="<u8").tobytes())
+        stream.seek(0)
+        stream.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets), index))
+    return len(offsets)
+
+
+def is_corpus(path: str) -> bool:
+    """Verifica se o ficheiro começa pela assinatura do formato binário."""
+    with open(path, "rb") as stream:
+        return stream.read(len(MAGIC)) == MAGIC
+
+
+class Corpus:
+    """Acesso a um ficheiro no formato binário, através de mmap. Corpus(path)[k]
+    devolve a matriz de valores do tabuleiro k sem ler os restantes."""
+    def __init__(self, path: str):
+        with open(path, "rb") as stream:
+            self.data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, index = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("{} não é um ficheiro de tabuleiros.".format(path))
+        if version != VERSION:
+            raise ValueError("Versão {} do formato não suportada.".format(version))
+        self.offsets = np.frombuffer(self.data, dtype="<u8", count=count,
+            offset=index)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, k: int) -> np.ndarray:
+        offset = int(self.offsets[k])
+        size, = RECORD.unpack_from(self.data, offset)
+        start = offset + RECORD.size
+        return unpack_cells(self.data[start:start + packed_size(size)], size)
+
+    def __iter__(self):
+        return (self[k] for k in range(len(self)))
+
+    def board(self, k: int, board_class=Board):
+        """Devolve o tabuleiro k como Board (ou a classe dada)."""
+        return board_class.from_cells(self[k])
+
+    def close(self):
+        # O índice é uma vista sobre o mmap e tem de ser largado antes
+        self.offsets = None
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def format_cells(cells: np.ndarray, header: bool = True) -> str:
+    """Texto de um tabuleiro: no formato de input (com a linha de N) ou,
+    sem 'header', no formato de Board.__str__."""
+    rows = ["\t".join(map(str, row)) for row in cells.tolist()]
+    if header:
+        rows.insert(0, str(len(cells)))
+    return "\n".join(rows)
+
+
+def text_to_corpus(streams, path: str) -> int:
+    """Converte as instâncias dos streams de texto dados (uma ou várias
+    seguidas em cada um) num ficheiro binário."""
+    return write_corpus(path, (cells for stream in streams
+                               for cells in iter_cells(stream)))
+
+
+def corpus_to_text(path: str, out=sys.stdout, header: bool = True):
+    """Escreve os tabuleiros de um ficheiro binário no formato de texto,
+    um a seguir ao outro (separados por uma linha vazia sem 'header')."""
+    with Corpus(path) as corpus:
+        for k, cells in enumerate(corpus):
+            if k > 0 and not header:
+                out.write("\n")
+            out.write(format_cells(cells, header) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Conversão entre o formato de texto e o formato binário.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser("pack", help="texto -> binário")
+    pack.add_argument("inputs", nargs="*",
+        help="ficheiros de texto ('-' ou nada: stdin)")
+    pack.add_argument("-o", "--output", required=True,
+        help="ficheiro binário a criar")
+
+    unpack = commands.add_parser("unpack", help="binário -> texto")
+    unpack.add_argument("corpus")
+    unpack.add_argument("--no-header", action="store_true",
+        help="escrever no formato de Board.__str__ (sem a linha de N)")
+
+    get = commands.add_parser("get", help="escrever um tabuleiro")
+    get.add_argument("corpus")
+    get.add_argument("index", type=int)
+    get.add_argument("--board", choices=BOARDS, default="numpy",
+        help="representação usada para reconstruir o tabuleiro")
+
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        def streams():
+            for path in args.inputs or ["-"]:
+                if path == "-":
+                    yield sys.stdin
+                else:
+                    with open(path, "rb") as stream:
+                        yield stream
+        count = text_to_corpus(streams(), args.output)
+        print("{} tabuleiros escritos em {}".format(count, args.output),
+            file=sys.stderr)
+    elif args.command == "unpack":
+        corpus_to_text(args.corpus, header=not args.no_header)
+    else:
+        with Corpus(args.corpus) as corpus:
+            print(corpus.board(args.index, BOARDS[args.board]))
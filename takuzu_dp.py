@@ -0,0 +1,201 @@
+# takuzu_dp.py: Resolução do Takuzu linha a linha por programação dinâmica.
+# O tabuleiro é preenchido uma linha inteira de cada vez, escolhida entre as
+# linhas válidas compatíveis com as posições dadas (takuzu_lines). De cada
+# coluna basta saber, depois de cada linha, os valores das duas últimas
+# linhas (regra dos três seguidos) e quantos 1's já tem (equilíbrio); a regra
+# das colunas diferentes só pode ser verificada no fim. Para cada coluna,
+# uma tabela calculada de trás para a frente diz que estados (linha, dois
+# últimos valores, 1's) ainda se conseguem completar com as posições dadas
+# mais abaixo, e os estados de todo o tabuleiro (linha, penúltima, última,
+# 1's por coluna) são memorizados, pelo que a procura de soluções só desce
+# por linhas que levam a um estado com continuação.
+#
+# Funciona bem quando cada linha tem poucas posições livres (ou poucas
+# completações válidas); em tabuleiros grandes e esparsos (21 a 31, com 70%
+# ou mais de posições vazias) os estados das colunas quase nunca se repetem e
+# cada linha tem milhares de candidatas, pelo que o tempo cresce muito. Por
+# isso o trabalho pode ser limitado com 'max_work' (ver WorkLimit). As
+# candidatas de cada linha só são geradas à medida que a procura as pede, e
+# contam para esse limite, pelo que um tabuleiro grande e vazio também
+# desiste depressa.
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+from takuzu_lines import iter_line_completions
+
+# Valor das linhas "anteriores" à primeira, nas tabelas das colunas
+NO_VALUE = 2
+
+
+class WorkLimit(Exception):
+    """Levantada quando o trabalho da PD passa o limite dado a RowDP."""
+
+
+def column_states(size: int, values: list) -> list:
+    """Devolve, para cada linha i de 0 a N, o conjunto de estados (a, b,
+    ones) de uma coluna com as primeiras i linhas preenchidas (a e b são os
+    valores das linhas i-2 e i-1, ou NO_VALUE, e ones o número de 1's) a
+    partir dos quais a coluna ainda pode ser completada. 'values' tem os
+    valores dados da coluna (2 nas posições vazias)."""
+    max_num_value = (size + 1) // 2
+    states = [set() for _ in range(size + 1)]
+    states[size] = {(a, b, ones) for a in (0, 1, NO_VALUE)
+                    for b in (0, 1, NO_VALUE)
+                    for ones in range(max_num_value + 1)
+                    if size - ones <= max_num_value}
+
+    for i in range(size - 1, -1, -1):
+        options = (values[i],) if values[i] != 2 else (0, 1)
+        for a in ((0, 1) if i >= 2 else (NO_VALUE,)):
+            for b in ((0, 1) if i >= 1 else (NO_VALUE,)):
+                for ones in range(min(i, max_num_value) + 1):
+                    if i - ones > max_num_value:
+                        continue
+                    for value in options:
+                        if a == b == value:
+                            continue
+                        if (b, value, ones + value) in states[i + 1]:
+                            states[i].add((a, b, ones))
+                            break
+    return states
+
+
+class RowDP:
+    """Programação dinâmica sobre as linhas de um tabuleiro (Board ou
+    BitBoard). Com 'max_work', levanta WorkLimit quando o trabalho passar
+    esse valor: a tabela de estados de cada coluna conta 4 * N * (N//2 + 1),
+    cada linha candidata gerada conta N, e cada candidata examinada conta 1
+    mais as colunas verificadas (entre meio milhão e dois milhões por
+    segundo, para qualquer N)."""
+    def __init__(self, board, max_work: int = None):
+        self.size = size = int(board.size)
+        self.max_work = max_work
+        self.work = 0   # ver a docstring da classe
+        # Candidatas já geradas de cada linha, e o gerador das restantes
+        # (None quando estão todas geradas)
+        self.candidates = [[] for _ in range(size)]
+        self.pending = [iter_line_completions(size, *board.line_masks(0, i))
+                        for i in range(size)]
+        self.column_states = []
+        for j in range(size):
+            self.add_work(4 * size * (size // 2 + 1))
+            values = [int(board.get_number(i, j)) for i in range(size)]
+            self.column_states.append(column_states(size, values))
+        self.feasible_memo = {}
+
+    def add_work(self, amount: int):
+        """Soma 'amount' ao trabalho feito e levanta WorkLimit se passar o
+        limite."""
+        self.work += amount
+        if self.max_work is not None and self.work > self.max_work:
+            raise WorkLimit()
+
+    def row_candidates(self, i: int):
+        """Gera as linhas candidatas da linha i (ver
+        takuzu_lines.iter_line_completions), gerando-as da primeira vez que
+        são pedidas e guardando-as para as vezes seguintes."""
+        cache = self.candidates[i]
+        k = 0
+        while True:
+            if k == len(cache):
+                pending = self.pending[i]
+                line = next(pending, None) if pending is not None else None
+                if line is None:
+                    self.pending[i] = None
+                    return
+                # -> gerar a linha custa cerca de uma unidade por posição
+                self.add_work(self.size)
+                cache.append(line)
+            yield cache[k]
+            k += 1
+
+    def transitions(self, i: int, prev2: int, prev1: int, counts: tuple):
+        """Gera (linha, novas contagens de 1's) para as linhas candidatas da
+        linha i com que todas as colunas ainda podem ser completadas.
+        'prev2' e 'prev1' são as linhas i-2 e i-1 (0 se não existirem)."""
+        size = self.size
+        full = (1 << size) - 1
+        tables = [states[i + 1] for states in self.column_states]
+        for line in self.row_candidates(i):
+            self.add_work(1)
+            # -> tipo 0 0 0 / 1 1 1 nas colunas
+            if i >= 2 and (line & prev1 & prev2 or
+                           ~line & ~prev1 & ~prev2 & full):
+                continue
+            new_counts = []
+            for j in range(size):
+                value = line >> j & 1
+                ones = counts[j] + value
+                state = (prev1 >> j & 1 if i >= 1 else NO_VALUE, value, ones)
+                if state not in tables[j]:
+                    break
+                new_counts.append(ones)
+            # -> cada coluna verificada também conta como trabalho
+            self.work += len(new_counts)
+            if len(new_counts) == size:
+                yield line, tuple(new_counts)
+
+    def initial_state(self):
+        """Estado (linha, penúltima, última, 1's por coluna) do tabuleiro
+        sem nenhuma linha preenchida."""
+        return 0, 0, 0, (0,) * self.size
+
+    def feasible(self, i: int, prev2: int, prev1: int, counts: tuple) -> bool:
+        """Verifica se as linhas i..N-1 podem ser preenchidas a partir do
+        estado dado (ignorando as regras de linhas/colunas diferentes)."""
+        if i == self.size:
+            return True
+        key = (i, prev2, prev1, counts)
+        result = self.feasible_memo.get(key)
+        if result is None:
+            result = any(self.feasible(i + 1, prev1, line, new_counts)
+                         for line, new_counts
+                         in self.transitions(i, prev2, prev1, counts))
+            self.feasible_memo[key] = result
+        return result
+
+    def columns(self, rows: list) -> list:
+        """Máscaras das colunas de um tabuleiro completo."""
+        return [sum((rows[i] >> j & 1) << i for i in range(self.size))
+                for j in range(self.size)]
+
+    def solutions(self):
+        """Gera as soluções (listas com a máscara dos 1's de cada linha) em
+        profundidade, linha a linha, descendo só para estados com
+        continuação e sem repetir linhas; as colunas repetidas são
+        rejeitadas no fim."""
+        size = self.size
+        rows = []
+        used = set()
+        # Pilha de iteradores sobre as transições de cada linha
+        stack = [self.transitions(*self.initial_state())]
+        while stack:
+            for line, counts in stack[-1]:
+                i = len(rows)
+                prev1 = rows[-1] if rows else 0
+                if line in used or not self.feasible(i + 1, prev1, line, counts):
+                    continue
+                rows.append(line)
+                used.add(line)
+                if i + 1 == size:
+                    if len(set(self.columns(rows))) == size:
+                        yield rows[:]
+                    used.discard(rows.pop())
+                    continue
+                stack.append(self.transitions(i + 1, prev1, line, counts))
+                break
+            else:
+                stack.pop()
+                if rows:
+                    used.discard(rows.pop())
+
+
+def row_solutions(board, max_work: int = None):
+    """Gera as soluções do tabuleiro como listas de ações (row, col, value)
+    que preenchem as posições vazias (ver RowDP para 'max_work')."""
+    size = int(board.size)
+    for rows in RowDP(board, max_work).solutions():
+        yield [(i, j, rows[i] >> j & 1) for i in range(size)
+               for j in range(size) if board.get_number(i, j) == 2]
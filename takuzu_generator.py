@@ -0,0 +1,353 @@
+# takuzu_generator.py: Gerador de instâncias de Takuzu para testes de carga.
+# Gera primeiro um tabuleiro completo e válido, partindo de um tabuleiro
+# construído com pares 01/10 e voltando a preencher ao acaso muitas janelas
+# pequenas (tudo a partir de uma semente, por isso determinístico). Escolhe
+# depois as posições dadas: são reveladas posições ao acaso até a propagação
+# de restrições conseguir completar o tabuleiro sozinha. Como a propagação
+# só faz deduções forçadas, a solução é única. Estas posições são perto de
+# metade do tabuleiro (0,47 a 0,51 para qualquer N), e a propagação resolve
+# a instância sem procura. Com --density, são reveladas mais posições ao
+# acaso, ou retiradas posições até à densidade pedida enquanto a solução
+# continuar única (ver remove_clues); se não for possível, o gerador avisa.
+#
+# Num núcleo, sem retirar posições, gera cerca de 300 instâncias 50x50 por
+# minuto (0,19 s cada), mas só cerca de 70 instâncias 100x100 por minuto
+# (0,85 s cada) e cerca de 13 instâncias 200x200 por minuto (4,6 s cada): o
+# custo cresce mais depressa do que N*N. Para centenas de instâncias grandes
+# por minuto é preciso correr vários processos (por exemplo com sementes
+# diferentes). Retirar posições é muito mais caro: um 31x31 com --density
+# 0.1 fica com cerca de 0,27 e demora cerca de 13 s, e um 50x50 com
+# --density 0.3 demora cerca de 40 s.
+#
+#   python takuzu_generator.py 100 --density 0.6 --seed 7 > input_100
+#   python takuzu_generator.py 20 --density 0.25 --seed 3 > esparsa_20
+#   python takuzu_generator.py 60 --count 50 --seed 1 > muitas_60
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import argparse
+import random
+import sys
+
+from takuzu import BitBoard, Takuzu, propagate_constraints, row_dp_solutions
+from takuzu_dp import WorkLimit
+
+# Trabalho da PD (ver takuzu_dp.RowDP) gasto em cada posição que se tenta
+# retirar antes de a manter
+REMOVE_MAX_WORK = 30000
+
+
+def empty_board(size: int) -> BitBoard:
+    """Devolve um BitBoard de tamanho 'size' sem nenhuma posição preenchida."""
+    return BitBoard(size, [0]*size, [0]*size, [0]*size, [0]*size,
+        [(0, size)]*size, [(0, size)]*size)
+
+
+def solved_board(size: int, rows: list) -> BitBoard:
+    """Constrói um BitBoard completo a partir das máscaras dos 1's de cada
+    linha."""
+    full = (1 << size) - 1
+    cols = [sum(((rows[i] >> j) & 1) << i for i in range(size))
+            for j in range(size)]
+    return BitBoard(size, [full]*size, rows[:], [full]*size, cols,
+        [(rows[i].bit_count(), 0) for i in range(size)],
+        [(cols[j].bit_count(), 0) for j in range(size)])
+
+
+def domino_line(bits: int, half: int) -> int:
+    """Linha de tamanho 2*half feita de pares 10/01: o bit k de 'bits'
+    indica se o par k tem o 1 na posição 2k ou na posição 2k+1."""
+    line = 0
+    for k in range(half):
+        line |= 1 << (2*k if (bits >> k) & 1 else 2*k + 1)
+    return line
+
+
+def base_solution(size: int, rng: random.Random) -> list:
+    """Devolve as máscaras dos 1's das linhas de um tabuleiro completo e
+    válido. Para N = 2n, cada linha é feita de pares 10/01 e as linhas 2m e
+    2m+1 são complementares, pelo que todas as linhas e colunas ficam
+    equilibradas e sem três números iguais seguidos; são todas diferentes
+    se as n escolhas de pares forem diferentes entre si e dos complementos
+    umas das outras (nas linhas e nas colunas). Para N = 2n+1 junta-se
+    ainda uma última linha e uma última coluna."""
+    half = size // 2
+    mask = (1 << half) - 1
+
+    def distinct(lines):
+        seen = set()
+        for line in lines:
+            if line in seen or (~line & mask) in seen:
+                return False
+            seen.add(line)
+        return True
+
+    while True:
+        choices = [rng.getrandbits(half) if half else 0 for _ in range(half)]
+        transposed = [sum(((choices[m] >> k) & 1) << m for m in range(half))
+                      for k in range(half)]
+        if not (distinct(choices) and distinct(transposed)):
+            continue
+
+        rows = []
+        for bits in choices:
+            rows.append(domino_line(bits, half))
+            rows.append(domino_line(~bits & mask, half))
+        if size % 2 == 0:
+            return rows
+
+        # Última coluna e última linha (partilham a posição do canto); antes
+        # da última posição acabam sempre num par 10/01, logo nunca formam
+        # três iguais seguidos nem desequilibram as outras linhas/colunas
+        corner = rng.getrandbits(1) << 2*half
+        last_col = domino_line(rng.getrandbits(half) if half else 0, half) | corner
+        last_row = domino_line(rng.getrandbits(half) if half else 0, half) | corner
+        rows = [row | (((last_col >> i) & 1) << 2*half)
+                for i, row in enumerate(rows)] + [last_row]
+        if (len(set(rows)) == size and
+                len(set(solved_board(size, rows).col_ones)) == size):
+            return rows
+
+
+def resolve_window(grid: list, top: int, left: int, width: int,
+ rng: random.Random, budget: int) -> bool:
+    """Volta a preencher, por procura em profundidade com valores
+    aleatórios, a janela width x width com canto em (top, left) de um
+    tabuleiro completo e válido (lista de listas de 0's e 1's, alterada).
+    Cada linha e coluna da janela mantém o número de 0's e 1's que tinha,
+    pelo que o equilíbrio do tabuleiro se mantém; só é preciso evitar três
+    números iguais seguidos. Se a procura exceder 'budget' tentativas, a
+    janela é reposta e devolve False."""
+    size = len(grid)
+    old = [grid[i][left:left + width] for i in range(top, top + width)]
+
+    # Quantos 0's e 1's faltam pôr em cada linha/coluna da janela
+    need_row = [[0, 0] for _ in range(width)]
+    need_col = [[0, 0] for _ in range(width)]
+    for a in range(width):
+        for b in range(width):
+            value = grid[top + a][left + b]
+            need_row[a][value] += 1
+            need_col[b][value] += 1
+            grid[top + a][left + b] = 2
+
+    def no_triple(i, j, value):
+        """Verifica se pôr 'value' em (i, j) não forma três iguais seguidos
+        (as posições ainda vazias da janela valem 2)."""
+        row = grid[i]
+        before = j >= 1 and row[j-1] == value
+        after = j < size - 1 and row[j+1] == value
+        if ((before and (after or j >= 2 and row[j-2] == value)) or
+                (after and j < size - 2 and row[j+2] == value)):
+            return False
+        before = i >= 1 and grid[i-1][j] == value
+        after = i < size - 1 and grid[i+1][j] == value
+        return not ((before and (after or i >= 2 and grid[i-2][j] == value)) or
+                    (after and i < size - 2 and grid[i+2][j] == value))
+
+    # Pilha de valores ainda por tentar em cada posição da janela
+    cells = width * width
+    untried = [None] * cells
+    k = tries = 0
+    while 0 <= k < cells and tries <= budget:
+        a, b = divmod(k, width)
+        i, j = top + a, left + b
+        if untried[k] is None:
+            untried[k] = [0, 1] if rng.random() < 0.5 else [1, 0]
+        else:
+            value = grid[i][j]
+            need_row[a][value] += 1
+            need_col[b][value] += 1
+            grid[i][j] = 2
+
+        while untried[k]:
+            value = untried[k].pop()
+            tries += 1
+            if need_row[a][value] and need_col[b][value]:
+                if no_triple(i, j, value):
+                    grid[i][j] = value
+                    need_row[a][value] -= 1
+                    need_col[b][value] -= 1
+                    k += 1
+                    break
+        else:
+            untried[k] = None
+            k -= 1
+
+    if k == cells:
+        return True
+    for a in range(width):
+        grid[top + a][left:left + width] = old[a]
+    return False
+
+
+def line_mask(values: list) -> int:
+    """Máscara dos 1's de uma linha/coluna completa (lista de 0's e 1's)."""
+    return int("".join(map(str, reversed(values))), 2)
+
+
+def shuffle_solution(size: int, rows: list, rng: random.Random,
+ passes: int = 3, width: int = 6, budget: int = 2000) -> list:
+    """Baralha um tabuleiro completo e válido (máscaras dos 1's das linhas)
+    voltando a preencher ao acaso janelas aleatórias, em média 'passes'
+    vezes cada posição. Uma janela nova só é aceite se não repetir linhas
+    nem colunas."""
+    width = min(width, size)
+    grid = [[(row >> j) & 1 for j in range(size)] for row in rows]
+    row_masks = rows[:]
+    col_masks = [line_mask([row[j] for row in grid]) for j in range(size)]
+    row_set, col_set = set(row_masks), set(col_masks)
+    span = size - width + 1
+
+    for _ in range(passes * size * size // (width * width) + 1):
+        top, left = rng.randrange(span), rng.randrange(span)
+        if not resolve_window(grid, top, left, width, rng, budget):
+            continue
+
+        window_rows = range(top, top + width)
+        window_cols = range(left, left + width)
+        new_rows = [line_mask(grid[i]) for i in window_rows]
+        new_cols = [line_mask([row[j] for row in grid]) for j in window_cols]
+        row_set.difference_update(row_masks[i] for i in window_rows)
+        col_set.difference_update(col_masks[j] for j in window_cols)
+
+        if (len(set(new_rows)) == width and len(set(new_cols)) == width and
+                row_set.isdisjoint(new_rows) and col_set.isdisjoint(new_cols)):
+            for i, mask in zip(window_rows, new_rows):
+                row_masks[i] = mask
+            for j, mask in zip(window_cols, new_cols):
+                col_masks[j] = mask
+        else:
+            # Linhas/colunas repetidas: repor a janela anterior
+            for i in window_rows:
+                grid[i] = [(row_masks[i] >> j) & 1 for j in range(size)]
+        row_set.update(row_masks[i] for i in window_rows)
+        col_set.update(col_masks[j] for j in window_cols)
+
+    return row_masks
+
+
+def random_solution(size: int, rng: random.Random, passes: int = 3) -> BitBoard:
+    """Gera um tabuleiro completo e válido aleatório, baralhando o de
+    base_solution. Preencher diretamente um tabuleiro vazio por procura
+    falha quase sempre nas últimas linhas (que ficam determinadas pelas
+    colunas) e obriga a recuar muito para N grande."""
+    rows = base_solution(size, rng)
+    return solved_board(size, shuffle_solution(size, rows, rng, passes))
+
+
+def choose_clues(solution: BitBoard, rng: random.Random,
+ density: float = None) -> list:
+    """Devolve a lista de posições (row, col) a revelar da solução, de modo
+    a que a propagação a partir delas complete o tabuleiro. Com 'density'
+    (fração do total de posições), são acrescentadas posições ao acaso ou
+    retiradas com remove_clues até chegar a essa fração, se possível."""
+    size = solution.size
+    cells = [(i, j) for i in range(size) for j in range(size)]
+    rng.shuffle(cells)
+
+    board = empty_board(size)
+    clues = []
+    for i, j in cells:
+        if board.is_solved():
+            break
+        if board.get_number(i, j) != 2:
+            continue
+        board.set_number(i, j, solution.get_number(i, j))
+        clues.append((i, j))
+        propagate_constraints(board, [(0, i), (1, j)])
+
+    if density is None:
+        return clues
+    wanted = int(round(density * size * size))
+    if wanted < len(clues):
+        return remove_clues(solution, clues, rng, wanted)
+
+    # Posições extra para atingir a densidade pedida
+    chosen = set(clues)
+    extra = [cell for cell in cells if cell not in chosen]
+    return clues + extra[:wanted - len(clues)]
+
+
+def clue_board(solution: BitBoard, clues) -> BitBoard:
+    """Devolve o tabuleiro só com as posições 'clues' da solução."""
+    board = empty_board(solution.size)
+    for i, j in clues:
+        board.set_number(i, j, solution.get_number(i, j))
+    return board
+
+
+def remove_clues(solution: BitBoard, clues: list, rng: random.Random,
+ wanted: int, max_work: int = REMOVE_MAX_WORK) -> list:
+    """Retira posições de 'clues' (cuja única solução é 'solution'), por
+    ordem aleatória, até ficarem 'wanted' ou até não se conseguir retirar
+    mais nenhuma. Uma posição só é retirada se, com o outro valor, o
+    tabuleiro deixar de ter solução: a propagação chega a uma contradição ou
+    a PD (ver takuzu_dp) não encontra nenhuma. Se a PD exceder 'max_work', a
+    posição fica, pelo que a solução continua sempre única."""
+    kept = set(clues)
+    order = clues[:]
+    rng.shuffle(order)
+    for i, j in order:
+        if len(kept) <= wanted:
+            break
+        kept.discard((i, j))
+        board = clue_board(solution, kept)
+        board.set_number(i, j, 1 - solution.get_number(i, j))
+        problem = Takuzu(board)
+        try:
+            removable = (not problem.initial.consistent or
+                         next(row_dp_solutions(problem, max_work), None) is None)
+        except WorkLimit:
+            removable = False
+        if not removable:
+            kept.add((i, j))
+    return [cell for cell in clues if cell in kept]
+
+
+def generate_puzzle(size: int, density: float = None, seed=None) -> BitBoard:
+    """Gera uma instância de tamanho 'size' com solução única (ver
+    choose_clues para 'density'). A mesma semente dá sempre a mesma
+    instância."""
+    rng = random.Random(seed)
+    solution = random_solution(size, rng)
+    return clue_board(solution, choose_clues(solution, rng, density))
+
+
+def format_instance(board) -> str:
+    """Devolve o texto da instância no formato de Board.parse_instance."""
+    return "{}\n{}\n".format(board.size, board)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Gera instâncias de Takuzu com solução única.")
+    parser.add_argument("size", type=int, help="tamanho do tabuleiro (N)")
+    parser.add_argument("--density", type=float, default=None,
+        help="fração de posições dadas (por omissão, as que a propagação "
+             "precisa para completar o tabuleiro, perto de 0.5). Abaixo "
+             "disso são retiradas posições enquanto a solução for única, o "
+             "que é muito mais lento e pode não chegar à fração pedida "
+             "(nesse caso é escrito um aviso)")
+    parser.add_argument("--seed", type=int, default=None,
+        help="semente (a instância k usa seed + k)")
+    parser.add_argument("--count", type=int, default=1,
+        help="número de instâncias, escritas seguidas")
+    args = parser.parse_args()
+
+    if args.size < 1:
+        parser.error("o tamanho tem de ser pelo menos 1")
+    if args.density is not None and not 0.0 <= args.density <= 1.0:
+        parser.error("a densidade tem de estar entre 0 e 1")
+
+    for k in range(args.count):
+        seed = None if args.seed is None else args.seed + k
+        puzzle = generate_puzzle(args.size, args.density, seed)
+        sys.stdout.write(format_instance(puzzle))
+        if args.density is not None:
+            density = (puzzle.to_array() != 2).mean()
+            if density > args.density + 0.5 / args.size ** 2:
+                print("Aviso: instância {} com densidade {:.3f} (pedida {:.3f})"
+                      .format(k + 1, density, args.density), file=sys.stderr)
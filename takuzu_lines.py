@@ -0,0 +1,156 @@
+# takuzu_lines.py: Tabelas de linhas válidas do Takuzu.
+# Para um tabuleiro de tamanho N, o conjunto de linhas (ou colunas) que
+# respeitam as regras do Takuzu (número equilibrado de 0's e 1's, nunca três
+# números iguais seguidos) é fixo. Estas tabelas são geradas uma única vez por
+# tamanho e guardadas como arrays de máscaras de bits (bit j = posição j a 1).
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import functools
+import numpy as np
+
+# Acima deste número de linhas válidas as tabelas deixam de ser usadas
+# (N = 31 tem cerca de 2.5 milhões, N = 40 já tem perto de 10^8).
+MAX_TABLE_SIZE = 3_000_000
+
+_BYTE_POPCOUNT = np.array([bin(k).count("1") for k in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Devolve o número de bits a 1 de cada elemento de um array uint64."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _BYTE_POPCOUNT[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+@functools.lru_cache(maxsize=None)
+def count_valid_lines(size: int) -> int:
+    """Conta as linhas válidas de tamanho 'size' sem as gerar."""
+    max_num_value = (size + 1) // 2
+    # (número de 1's, último valor, comprimento da sequência) -> contagem
+    states = {(0, None, 0): 1}
+    for _ in range(size):
+        new_states = {}
+        for (ones, last, run), count in states.items():
+            for value in (0, 1):
+                new_run = run + 1 if value == last else 1
+                if new_run > 2:
+                    continue
+                key = (ones + value, value, new_run)
+                new_states[key] = new_states.get(key, 0) + count
+        states = new_states
+
+    return sum(count for (ones, _, _), count in states.items()
+               if ones <= max_num_value and size - ones <= max_num_value)
+
+
+@functools.lru_cache(maxsize=8)
+def valid_lines(size: int) -> np.ndarray:
+    """Devolve (ordenado) o array uint64 com todas as linhas válidas de
+    tamanho 'size'. O resultado é partilhado, não deve ser alterado."""
+    if size > 64:
+        raise ValueError("As tabelas de linhas só suportam N <= 64.")
+
+    max_num_value = (size + 1) // 2
+    lines = np.zeros(1, dtype=np.uint64)
+    for pos in range(size):
+        lines = np.concatenate((lines, lines | np.uint64(1 << pos)))
+
+        # -> tipo 0 0 0 / 1 1 1 acabado de formar
+        if pos >= 2:
+            window = (lines >> np.uint64(pos - 2)) & np.uint64(7)
+            lines = lines[(window != 0) & (window != 7)]
+
+        # -> 0's ou 1's a mais já no prefixo
+        ones = popcount(lines).astype(np.int64)
+        lines = lines[(ones <= max_num_value) &
+                      (pos + 1 - ones <= max_num_value)]
+
+    lines.sort()
+    lines.setflags(write=False)
+    return lines
+
+
+def line_domains(size: int, max_table_size: int = MAX_TABLE_SIZE):
+    """Devolve os domínios iniciais de todas as linhas e colunas, i.e.
+    [[tabela] * size, [tabela] * size], ou None se a tabela for demasiado
+    grande para este tamanho."""
+    if size > 64 or count_valid_lines(size) > max_table_size:
+        return None
+    table = valid_lines(size)
+    return [[table] * size, [table] * size]
+
+
+def filter_lines(lines: np.ndarray, filled: int, ones: int) -> np.ndarray:
+    """Devolve as linhas compatíveis com a atribuição parcial dada pelas
+    máscaras (filled, ones)."""
+    keep = (lines & np.uint64(filled)) == np.uint64(ones)
+    if keep.all():
+        return lines
+    return lines[keep]
+
+
+def exclude_lines(lines: np.ndarray, patterns) -> np.ndarray:
+    """Retira das linhas candidatas as que já aparecem em 'patterns'."""
+    excluded = np.fromiter(patterns, dtype=np.uint64)
+    keep = ~np.isin(lines, excluded)
+    if keep.all():
+        return lines
+    return lines[keep]
+
+
+def line_agreement(lines: np.ndarray, size: int) -> (int, int):
+    """Devolve (posições que são 0 em todas as linhas, posições que são 1 em
+    todas as linhas) de um conjunto não vazio de linhas candidatas."""
+    full = (1 << size) - 1
+    always_one = int(np.bitwise_and.reduce(lines))
+    sometimes_one = int(np.bitwise_or.reduce(lines))
+    return full & ~sometimes_one, always_one
+
+
+def iter_line_completions(size: int, filled: int, ones: int):
+    """Gera, uma de cada vez e sem ordem definida, as máscaras das linhas
+    válidas de tamanho 'size' compatíveis com a atribuição parcial (filled,
+    ones). Não precisa da tabela completa, pelo que serve para qualquer N.
+    Os prefixos são cortados logo que o resto da linha já não a consiga
+    equilibrar (com os valores dados mais à frente, e nunca mais de dois
+    terços das posições restantes com o mesmo valor), pelo que quase não há
+    trabalho entre duas linhas geradas."""
+    max_num_value = (size + 1) // 2
+    min_num_value = size - max_num_value
+    # 1's e 0's dados da posição pos em diante
+    ones_after = [0] * (size + 1)
+    zeros_after = [0] * (size + 1)
+    for pos in range(size - 1, -1, -1):
+        given = filled >> pos & 1
+        value = ones >> pos & 1
+        ones_after[pos] = ones_after[pos + 1] + (given and value)
+        zeros_after[pos] = zeros_after[pos + 1] + (given and not value)
+
+    # Pilha de (posição, prefixo, 1's no prefixo)
+    stack = [(0, 0, 0)]
+    while stack:
+        pos, line, count = stack.pop()
+        if pos == size:
+            yield line
+            continue
+        if filled >> pos & 1:
+            values = (ones >> pos & 1,)
+        else:
+            values = (1, 0)
+        rest = size - pos - 1
+        most = rest - rest // 3
+        for value in values:
+            new_count = count + value
+            zeros = pos + 1 - new_count
+            if (new_count + ones_after[pos + 1] > max_num_value or
+                    zeros + zeros_after[pos + 1] > max_num_value or
+                    new_count + min(most, rest - zeros_after[pos + 1]) < min_num_value or
+                    zeros + min(most, rest - ones_after[pos + 1]) < min_num_value):
+                continue
+            # -> tipo 0 0 0 / 1 1 1
+            if pos >= 2 and (line >> (pos - 2)) & 3 == 3 * value:
+                continue
+            stack.append((pos + 1, line | value << pos, new_count))
@@ -0,0 +1,206 @@
+# takuzu_portfolio.py: Resolução do Takuzu com um portefólio de estratégias.
+# O mesmo tabuleiro é resolvido em simultâneo por várias estratégias (as de
+# takuzu_benchmark.STRATEGIES, ou combinações procura:ramificação:ordem de
+# valores), cada uma no seu processo; fica a primeira solução e os restantes processos
+# são terminados. A estratégia vencedora de cada instância pode ser
+# registada num ficheiro (uma linha JSON por instância), e o comando summary
+# conta as vitórias por tamanho de tabuleiro, para escolher a estratégia por
+# omissão de cada tamanho.
+#
+#   python takuzu_portfolio.py solve --log vitorias.jsonl < testes-takuzu/input_T13
+#   python takuzu_portfolio.py solve -s trail-line dfs:line:balance astar::balance < ...
+#   python takuzu_portfolio.py summary vitorias.jsonl
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import argparse
+import collections
+import json
+import multiprocessing
+import queue
+import sys
+import time
+
+from takuzu import BOARDS, BRANCHING, SEARCHES, VALUE_ORDERS, Takuzu, iter_boards
+from takuzu_benchmark import STRATEGIES
+
+# Estratégias lançadas por omissão
+DEFAULT_PORTFOLIO = ("dfs", "astar", "greedy", "trail-line",
+                     "trail-line-balance", "trail-probe", "cbj-line", "sat")
+
+# Resultado de uma corrida: 'solution' é o tabuleiro resolvido (ou None),
+# 'winner' a estratégia que o encontrou, e 'errors' os motivos das
+# estratégias que terminaram sem solução.
+PortfolioResult = collections.namedtuple("PortfolioResult",
+    ["solution", "winner", "seconds", "errors"])
+
+
+def parse_strategy(name: str):
+    """Devolve (procura, opções de Takuzu) de uma estratégia: um nome de
+    STRATEGIES ou 'procura[:ramificação[:ordem de valores]]', com nomes de
+    SEARCHES, BRANCHING e VALUE_ORDERS (as partes vazias ficam por omissão,
+    por exemplo 'astar::balance')."""
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    parts = name.split(":")
+    if len(parts) > 3 or parts[0] not in SEARCHES:
+        raise ValueError("Estratégia desconhecida: {}".format(name))
+    options = {}
+    for part, key, choices in zip(parts[1:], ("branching", "value_order"),
+                                  (BRANCHING, VALUE_ORDERS)):
+        if part:
+            if part not in choices:
+                raise ValueError("Estratégia desconhecida: {}".format(name))
+            options[key] = part
+    return parts[0], options
+
+
+def strategy_argument(name: str) -> str:
+    """Tipo do argparse que valida um nome de estratégia."""
+    try:
+        parse_strategy(name)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return name
+
+
+def run_strategy(strategy, cells, board, results):
+    """Corpo de cada processo: resolve o tabuleiro (matriz de valores) com
+    a estratégia dada e coloca (estratégia, matriz da solução ou None,
+    erro) na fila 'results'."""
+    search, options = parse_strategy(strategy)
+    try:
+        goal_node = SEARCHES[search](Takuzu(BOARDS[board].from_cells(cells),
+            **options))
+    except Exception as error:
+        results.put((strategy, None, repr(error)))
+        return
+    if goal_node is None:
+        results.put((strategy, None, "no solution"))
+    else:
+        results.put((strategy, goal_node.state.board.to_array(), None))
+
+
+def solve_portfolio(board, strategies=DEFAULT_PORTFOLIO, timeout=None,
+ board_kind="numpy"):
+    """Resolve o tabuleiro com todas as estratégias em paralelo e devolve
+    um PortfolioResult com a primeira solução encontrada. Os processos que
+    ainda estiverem a correr são terminados. Se nenhuma estratégia
+    encontrar uma solução (ou se 'timeout' segundos passarem), 'solution'
+    e 'winner' são None."""
+    cells = board.to_array()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_strategy,
+        args=(strategy, cells, board_kind, results), daemon=True)
+        for strategy in strategies]
+
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    errors = {}
+    try:
+        while len(errors) < len(processes):
+            remaining = None
+            if timeout is not None:
+                remaining = timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    break
+            try:
+                strategy, solution, error = results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if solution is not None:
+                return PortfolioResult(BOARDS[board_kind].from_cells(solution),
+                    strategy, time.perf_counter() - start, errors)
+            errors[strategy] = error
+        for strategy in strategies:
+            errors.setdefault(strategy, "timeout")
+        return PortfolioResult(None, None, time.perf_counter() - start, errors)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        results.close()
+
+
+def log_result(stream, name, size, strategies, result):
+    """Acrescenta ao registo uma linha JSON com a vencedora da instância."""
+    record = {"instance": name, "size": size, "winner": result.winner,
+              "seconds": result.seconds, "strategies": list(strategies),
+              "errors": result.errors}
+    stream.write(json.dumps(record) + "\n")
+    stream.flush()
+
+
+def summarize_log(stream) -> dict:
+    """Lê um registo de log_result e devolve, para cada tamanho de
+    tabuleiro, um Counter com as vitórias de cada estratégia (None conta
+    as instâncias sem vencedora)."""
+    wins = collections.defaultdict(collections.Counter)
+    for line in stream:
+        if line.strip():
+            record = json.loads(line)
+            wins[record["size"]][record["winner"]] += 1
+    return dict(wins)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Portefólio de estratégias para o Takuzu.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solve = commands.add_parser("solve",
+        help="resolver as instâncias do stdin com todas as estratégias")
+    solve.add_argument("-s", "--strategies", nargs="+", type=strategy_argument,
+        default=list(DEFAULT_PORTFOLIO), help="estratégias lançadas: nomes de "
+        "takuzu_benchmark.STRATEGIES ({}) ou procura:ramificação:ordem de "
+        "valores".format(", ".join(STRATEGIES)))
+    solve.add_argument("--board", choices=BOARDS, default="numpy",
+        help="representação interna do tabuleiro")
+    solve.add_argument("--timeout", type=float, default=None,
+        help="tempo máximo por instância, em segundos")
+    solve.add_argument("--log", default=None,
+        help="ficheiro onde acrescentar a estratégia vencedora de cada instância")
+
+    summary = commands.add_parser("summary",
+        help="vitórias por tamanho de tabuleiro num registo")
+    summary.add_argument("log")
+
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        with open(args.log) as stream:
+            wins = summarize_log(stream)
+        for size in sorted(wins):
+            print("{:3} {}".format(size, ", ".join("{} {}".format(name, count)
+                for name, count in wins[size].most_common())))
+        sys.exit()
+
+    log = open(args.log, "a") if args.log else None
+    failures = 0
+    try:
+        for index, board in enumerate(iter_boards(sys.stdin, BOARDS[args.board])):
+            result = solve_portfolio(board, args.strategies, args.timeout,
+                args.board)
+            name = "stdin#{}".format(index + 1)
+            if log is not None:
+                log_result(log, name, int(board.size), args.strategies, result)
+            if index > 0:
+                print()
+            if result.solution is None:
+                failures += 1
+                print("{}: FAILED {}".format(name, result.errors), file=sys.stderr)
+                continue
+            print(result.solution, sep="")
+            print("{}: {} ({:.3f}s)".format(name, result.winner, result.seconds),
+                file=sys.stderr)
+    finally:
+        if log is not None:
+            log.close()
+
+    sys.exit(1 if failures else 0)
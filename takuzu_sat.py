@@ -0,0 +1,609 @@
+# takuzu_sat.py: Codificação do Takuzu em SAT e resolvedor CDCL.
+# Um tabuleiro é traduzido numa fórmula em forma normal conjuntiva (CNF): a
+# variável i*N + j + 1 é verdadeira se a posição (i, j) tiver o valor 1, e as
+# cláusulas proíbem três números iguais seguidos, limitam o número de 0's e
+# de 1's de cada linha/coluna (contador sequencial) e obrigam as linhas (e as
+# colunas) a serem diferentes duas a duas. As posições já preenchidas são
+# cláusulas unitárias e simplificam as restantes. A fórmula é resolvida com um
+# resolvedor CDCL (aprendizagem de cláusulas) sem dependências, ou exportada
+# em formato DIMACS para comparar com resolvedores externos.
+#
+#   python takuzu_sat.py < testes-takuzu/input_T01 > T01.cnf
+#   python takuzu_sat.py --model T01.out < testes-takuzu/input_T01
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import argparse
+import heapq
+import sys
+
+
+# --------------------------------- FÓRMULAS ----------------------------------
+class CNF:
+    """Fórmula em forma normal conjuntiva, com os literais no formato DIMACS
+    (v para a variável v verdadeira, -v para falsa)."""
+    def __init__(self, num_vars: int = 0):
+        self.num_vars = num_vars
+        self.clauses = []
+
+    def new_var(self) -> int:
+        """Cria uma variável auxiliar e devolve o seu número."""
+        self.num_vars += 1
+        return self.num_vars
+
+    def add_clause(self, clause):
+        """Acrescenta uma cláusula (iterável de literais)."""
+        self.clauses.append(list(clause))
+
+    def write_dimacs(self, stream, comments=()):
+        """Escreve a fórmula no formato DIMACS."""
+        for comment in comments:
+            stream.write("c {}\n".format(comment))
+        stream.write("p cnf {} {}\n".format(self.num_vars, len(self.clauses)))
+        for clause in self.clauses:
+            stream.write(" ".join(map(str, clause)) + " 0\n")
+
+
+def cell_var(size: int, row: int, col: int) -> int:
+    """Variável da posição (row, col): verdadeira se a posição tiver o
+    valor 1."""
+    return row * size + col + 1
+
+
+class TakuzuEncoder:
+    """Traduz um tabuleiro (Board ou BitBoard) para CNF. As posições já
+    preenchidas são constantes: as cláusulas satisfeitas por elas são
+    omitidas e os literais falsos retirados."""
+    def __init__(self, board):
+        self.board = board
+        self.size = size = int(board.size)
+        self.cnf = CNF(size * size)
+        self.values = [[int(board.get_number(i, j)) for j in range(size)]
+                       for i in range(size)]
+
+    def literal_value(self, literal: int):
+        """Devolve True/False se o literal for de uma posição preenchida, ou
+        None se ainda não tiver valor."""
+        var = abs(literal)
+        if var > self.size * self.size:
+            return None
+        value = self.values[(var - 1) // self.size][(var - 1) % self.size]
+        if value == 2:
+            return None
+        return (value == 1) == (literal > 0)
+
+    def add(self, clause):
+        """Acrescenta uma cláusula, simplificada pelas posições preenchidas
+        (uma cláusula vazia torna a fórmula impossível)."""
+        simplified = []
+        for literal in clause:
+            value = self.literal_value(literal)
+            if value is True:
+                return
+            if value is None:
+                simplified.append(literal)
+        self.cnf.add_clause(simplified)
+
+    def line_cells(self, axis: int, k: int) -> list:
+        """Posições (row, col) da linha k (axis = 0) ou da coluna k."""
+        if axis == 0:
+            return [(k, pos) for pos in range(self.size)]
+        return [(pos, k) for pos in range(self.size)]
+
+    def encode(self) -> CNF:
+        """Devolve a fórmula do tabuleiro."""
+        size = self.size
+        for i in range(size):
+            for j in range(size):
+                if self.values[i][j] != 2:
+                    var = cell_var(size, i, j)
+                    self.cnf.add_clause([var if self.values[i][j] else -var])
+
+        for axis in (0, 1):
+            lines = [self.line_cells(axis, k) for k in range(size)]
+            for cells in lines:
+                self.encode_triples(cells)
+                self.encode_balance(cells)
+            for a in range(size):
+                for b in range(a + 1, size):
+                    self.encode_different(lines[a], lines[b])
+        return self.cnf
+
+    def encode_triples(self, cells: list):
+        """Nunca três números iguais seguidos."""
+        size = self.size
+        for pos in range(len(cells) - 2):
+            x, y, z = (cell_var(size, i, j) for i, j in cells[pos:pos + 3])
+            self.add([x, y, z])
+            self.add([-x, -y, -z])
+
+    def encode_balance(self, cells: list):
+        """No máximo (N+1)//2 0's e (N+1)//2 1's na linha."""
+        max_num_value = (self.size + 1) // 2
+        free = [cell_var(self.size, i, j) for i, j in cells
+                if self.values[i][j] == 2]
+        ones = sum(self.values[i][j] == 1 for i, j in cells)
+        zeros = sum(self.values[i][j] == 0 for i, j in cells)
+        self.at_most(free, max_num_value - ones)
+        self.at_most([-var for var in free], max_num_value - zeros)
+
+    def at_most(self, literals: list, bound: int):
+        """No máximo 'bound' dos literais são verdadeiros (contador
+        sequencial de Sinz: s[i][c] indica que pelo menos c+1 dos primeiros
+        i+1 literais são verdadeiros)."""
+        n = len(literals)
+        if bound < 0:
+            self.cnf.add_clause([])
+            return
+        if bound >= n:
+            return
+        if bound == 0:
+            for literal in literals:
+                self.cnf.add_clause([-literal])
+            return
+
+        cnf = self.cnf
+        s = [[cnf.new_var() for _ in range(bound)] for _ in range(n - 1)]
+        cnf.add_clause([-literals[0], s[0][0]])
+        for c in range(1, bound):
+            cnf.add_clause([-s[0][c]])
+        for i in range(1, n - 1):
+            x = literals[i]
+            cnf.add_clause([-x, s[i][0]])
+            cnf.add_clause([-s[i-1][0], s[i][0]])
+            for c in range(1, bound):
+                cnf.add_clause([-x, -s[i-1][c-1], s[i][c]])
+                cnf.add_clause([-s[i-1][c], s[i][c]])
+            cnf.add_clause([-x, -s[i-1][bound-1]])
+        cnf.add_clause([-literals[n-1], -s[n-2][bound-1]])
+
+    def encode_different(self, cells_a: list, cells_b: list):
+        """As duas linhas (ou colunas) diferem em pelo menos uma posição.
+        Onde as duas posições estão vazias é criada uma variável que
+        implica que são diferentes."""
+        size = self.size
+        differ = []
+        for (ia, ja), (ib, jb) in zip(cells_a, cells_b):
+            a, b = self.values[ia][ja], self.values[ib][jb]
+            x, y = cell_var(size, ia, ja), cell_var(size, ib, jb)
+            if a != 2 and b != 2:
+                if a != b:
+                    return
+            elif a != 2:
+                differ.append(-y if a else y)
+            elif b != 2:
+                differ.append(-x if b else x)
+            else:
+                d = self.cnf.new_var()
+                self.cnf.add_clause([-d, x, y])
+                self.cnf.add_clause([-d, -x, -y])
+                differ.append(d)
+        self.cnf.add_clause(differ)
+
+
+def encode_board(board) -> CNF:
+    """Devolve a fórmula CNF cujas soluções são as soluções do tabuleiro."""
+    return TakuzuEncoder(board).encode()
+
+
+def decode_model(board, model) -> list:
+    """Devolve as ações (row, col, value) que preenchem as posições vazias
+    do tabuleiro segundo o modelo (model[v] é o valor da variável v)."""
+    size = int(board.size)
+    return [(i, j, int(bool(model[cell_var(size, i, j)])))
+            for i in range(size) for j in range(size)
+            if board.get_number(i, j) == 2]
+
+
+# ------------------------------- RESOLVEDOR CDCL ------------------------------
+# Os literais são guardados internamente como 2*v (v verdadeira) ou 2*v + 1
+# (v falsa), pelo que a negação de um literal l é l ^ 1. As duas primeiras
+# posições de cada cláusula são os literais vigiados.
+
+def luby(k: int) -> int:
+    """Termo k (a começar em 1) da sequência de Luby: 1 1 2 1 1 2 4 ..."""
+    while True:
+        power = 1
+        while power < k + 1:
+            power *= 2
+        if power == k + 1:
+            return power // 2
+        k -= power // 2 - 1
+
+
+class CDCLSolver:
+    """Resolvedor SAT com aprendizagem de cláusulas: propagação com dois
+    literais vigiados por cláusula, escolha de variáveis por atividade
+    (VSIDS), memória da última polaridade, recomeços segundo a sequência de
+    Luby e limpeza periódica das cláusulas aprendidas menos úteis.
+    Se 'decision_vars' for dado, só as variáveis 1..decision_vars são
+    escolhidas nas decisões: as restantes têm de ficar determinadas pela
+    propagação (ou ser indiferentes) quando aquelas têm todas valor."""
+    def __init__(self, num_vars: int, clauses, decision_vars: int = None,
+     restart_base: int = 100, var_decay: float = 0.95,
+     clause_decay: float = 0.999):
+        self.num_vars = num_vars
+        if decision_vars is None:
+            decision_vars = num_vars
+        self.decision_vars = decision_vars
+        self.restart_base = restart_base
+        self.var_decay = var_decay
+        self.clause_decay = clause_decay
+
+        # valor de cada literal: 1 verdadeiro, 0 falso, -1 sem valor
+        self.value = [-1] * (2 * num_vars + 2)
+        self.level = [0] * (num_vars + 1)
+        self.reason = [None] * (num_vars + 1)
+        self.polarity = [False] * (num_vars + 1)
+        self.activity = [0.0] * (num_vars + 1)
+        self.var_inc = 1.0
+        self.heap = [(0.0, v) for v in range(1, decision_vars + 1)]
+        self.seen = [False] * (num_vars + 1)
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+
+        self.watches = [[] for _ in range(2 * num_vars + 2)]
+        self.clauses = []
+        self.learnts = []
+        # atividade e LBD (número de níveis distintos) das cláusulas aprendidas
+        self.clause_activity = {}
+        self.clause_lbd = {}
+        self.clause_inc = 1.0
+        self.unsat = False
+
+        self.conflicts = self.decisions = self.propagations = 0
+
+        for clause in clauses:
+            self.add_clause(clause)
+
+    # --------------------------- cláusulas e atribuições ---------------------
+    def add_clause(self, clause):
+        """Acrescenta uma cláusula original (literais no formato DIMACS)."""
+        if self.unsat:
+            return
+        literals = set()
+        for literal in clause:
+            code = 2 * literal if literal > 0 else -2 * literal + 1
+            if code ^ 1 in literals:
+                return
+            literals.add(code)
+
+        # Simplificar pelas atribuições do nível 0
+        value = self.value
+        if any(value[code] == 1 for code in literals):
+            return
+        literals = [code for code in literals if value[code] != 0]
+        if not literals:
+            self.unsat = True
+        elif len(literals) == 1:
+            self.enqueue(literals[0], None)
+            self.unsat = self.propagate() is not None
+        else:
+            self.clauses.append(literals)
+            self.watch(literals)
+
+    def watch(self, clause: list):
+        """Vigia os dois primeiros literais da cláusula."""
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def enqueue(self, code: int, reason):
+        """Torna o literal verdadeiro, com a cláusula que o implicou (ou
+        None se for uma decisão)."""
+        value = self.value
+        value[code] = 1
+        value[code ^ 1] = 0
+        var = code >> 1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(code)
+
+    def propagate(self):
+        """Propaga as atribuições ainda não processadas do trilho. Devolve a
+        cláusula em conflito, ou None."""
+        value, watches, trail = self.value, self.watches, self.trail
+        conflict = None
+        while conflict is None and self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.propagations += 1
+            clauses = watches[false_lit]
+            i = j = 0
+            end = len(clauses)
+            while i < end:
+                clause = clauses[i]
+                i += 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if value[first] == 1:
+                    clauses[j] = clause
+                    j += 1
+                    continue
+
+                # Procurar outro literal para vigiar
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if value[literal] != 0:
+                        clause[1] = literal
+                        clause[k] = false_lit
+                        watches[literal].append(clause)
+                        break
+                else:
+                    clauses[j] = clause
+                    j += 1
+                    if value[first] == 0:
+                        conflict = clause
+                        while i < end:
+                            clauses[j] = clauses[i]
+                            j += 1
+                            i += 1
+                    else:
+                        self.enqueue(first, clause)
+            del clauses[j:]
+        return conflict
+
+    def cancel_until(self, level: int):
+        """Desfaz as atribuições dos níveis acima de 'level'."""
+        if len(self.trail_lim) <= level:
+            return
+        value, trail = self.value, self.trail
+        mark = self.trail_lim[level]
+        for code in trail[mark:]:
+            var = code >> 1
+            value[code] = value[code ^ 1] = -1
+            self.reason[var] = None
+            self.polarity[var] = not code & 1
+            if var <= self.decision_vars:
+                heapq.heappush(self.heap, (-self.activity[var], var))
+        del trail[mark:]
+        del self.trail_lim[level:]
+        self.qhead = mark
+
+    # ------------------------------- atividades ------------------------------
+    def bump_var(self, var: int):
+        """Aumenta a atividade de uma variável envolvida num conflito."""
+        activity = self.activity
+        activity[var] += self.var_inc
+        if activity[var] > 1e100:
+            for v in range(1, self.num_vars + 1):
+                activity[v] *= 1e-100
+            self.var_inc *= 1e-100
+            self.heap = [(-activity[v], v) for v in range(1, self.decision_vars + 1)
+                         if self.value[2 * v] == -1]
+            heapq.heapify(self.heap)
+        elif self.value[2 * var] == -1 and var <= self.decision_vars:
+            heapq.heappush(self.heap, (-activity[var], var))
+
+    def bump_clause(self, clause: list):
+        """Aumenta a atividade de uma cláusula aprendida."""
+        key = id(clause)
+        activity = self.clause_activity
+        activity[key] += self.clause_inc
+        if activity[key] > 1e20:
+            for other in activity:
+                activity[other] *= 1e-20
+            self.clause_inc *= 1e-20
+
+    def pick_branch(self):
+        """Devolve a variável sem valor mais ativa, ou None."""
+        heap, activity, value = self.heap, self.activity, self.value
+        while heap:
+            neg_activity, var = heapq.heappop(heap)
+            if value[2 * var] == -1 and -neg_activity == activity[var]:
+                return var
+        return None
+
+    # ---------------------------- análise de conflitos -----------------------
+    def analyze(self, conflict: list):
+        """Aprende a cláusula do primeiro ponto de implicação único (1UIP).
+        Devolve (cláusula, nível para onde recuar, LBD)."""
+        seen, level, reason, trail = self.seen, self.level, self.reason, self.trail
+        current = len(self.trail_lim)
+        learnt = [None]
+        pending = 0
+        code = None
+        index = len(trail) - 1
+        clause = conflict
+
+        while True:
+            if id(clause) in self.clause_activity:
+                self.bump_clause(clause)
+            for literal in (clause if code is None else clause[1:]):
+                var = literal >> 1
+                if not seen[var] and level[var] > 0:
+                    seen[var] = True
+                    self.bump_var(var)
+                    if level[var] >= current:
+                        pending += 1
+                    else:
+                        learnt.append(literal)
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            code = trail[index]
+            index -= 1
+            var = code >> 1
+            clause = reason[var]
+            seen[var] = False
+            pending -= 1
+            if pending == 0:
+                break
+        learnt[0] = code ^ 1
+
+        # Minimização: retira literais implicados só por outros da cláusula
+        minimized = [learnt[0]]
+        for literal in learnt[1:]:
+            clause = reason[literal >> 1]
+            if clause is None or any(not seen[other >> 1] and level[other >> 1] > 0
+                                     for other in clause[1:]):
+                minimized.append(literal)
+        for literal in learnt[1:]:
+            seen[literal >> 1] = False
+
+        # O literal de nível mais alto (depois do primeiro) fica vigiado
+        back_level = 0
+        if len(minimized) > 1:
+            best = max(range(1, len(minimized)),
+                       key=lambda k: level[minimized[k] >> 1])
+            minimized[1], minimized[best] = minimized[best], minimized[1]
+            back_level = level[minimized[1] >> 1]
+        lbd = len({level[literal >> 1] for literal in minimized})
+        return minimized, back_level, lbd
+
+    def reduce_learnts(self):
+        """Esquece metade das cláusulas aprendidas, mantendo as de LBD baixo e
+        as que são razão de alguma atribuição."""
+        locked = {id(self.reason[code >> 1]) for code in self.trail}
+        lbd, activity = self.clause_lbd, self.clause_activity
+        self.learnts.sort(key=lambda c: (lbd[id(c)], -activity[id(c)]))
+        half = len(self.learnts) // 2
+        kept = []
+        for k, clause in enumerate(self.learnts):
+            key = id(clause)
+            if k < half or lbd[key] <= 2 or key in locked:
+                kept.append(clause)
+            else:
+                del lbd[key], activity[key]
+        self.learnts = kept
+
+        self.watches = [[] for _ in range(2 * self.num_vars + 2)]
+        for clause in self.clauses:
+            self.watch(clause)
+        for clause in self.learnts:
+            self.watch(clause)
+
+    # --------------------------------- procura -------------------------------
+    def solve(self):
+        """Devolve um modelo (lista em que o índice v tem o valor booleano da
+        variável v; as variáveis que ficaram sem valor são False) ou None se
+        a fórmula for impossível."""
+        if self.unsat or self.propagate() is not None:
+            self.unsat = True
+            return None
+
+        restarts = 1
+        restart_limit = self.restart_base * luby(restarts)
+        conflicts_since_restart = 0
+        max_learnts = max(len(self.clauses) // 3, 1000)
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts_since_restart += 1
+                if not self.trail_lim:
+                    self.unsat = True
+                    return None
+
+                learnt, back_level, lbd = self.analyze(conflict)
+                self.cancel_until(back_level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.learnts.append(learnt)
+                    self.clause_activity[id(learnt)] = self.clause_inc
+                    self.clause_lbd[id(learnt)] = lbd
+                    self.watch(learnt)
+                    self.enqueue(learnt[0], learnt)
+                self.var_inc /= self.var_decay
+                self.clause_inc /= self.clause_decay
+
+                if conflicts_since_restart >= restart_limit:
+                    restarts += 1
+                    restart_limit = self.restart_base * luby(restarts)
+                    conflicts_since_restart = 0
+                    self.cancel_until(0)
+                continue
+
+            if len(self.learnts) - len(self.trail) >= max_learnts:
+                self.reduce_learnts()
+                max_learnts = int(max_learnts * 1.1)
+
+            var = self.pick_branch()
+            if var is None:
+                return [False] + [self.value[2 * v] == 1
+                                  for v in range(1, self.num_vars + 1)]
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(2 * var if self.polarity[var] else 2 * var + 1, None)
+
+
+def solve_cnf(cnf: CNF, decision_vars: int = None):
+    """Resolve a fórmula com o CDCLSolver. Devolve o modelo ou None."""
+    return CDCLSolver(cnf.num_vars, cnf.clauses, decision_vars).solve()
+
+
+def solve_board(board):
+    """Resolve o tabuleiro por SAT e devolve as ações (row, col, value) que
+    preenchem as posições vazias, ou None se não tiver solução. Só se decide
+    sobre as posições: com todas preenchidas, a propagação das cláusulas de
+    cardinalidade e de linhas diferentes deteta qualquer regra violada. O
+    modelo devolvido só é válido nas variáveis das posições: as auxiliares
+    dos contadores podem ficar a False, mas as de linhas diferentes que
+    ficam sem valor (linhas que diferem em mais de uma posição) são
+    devolvidas a False e podem deixar cláusulas por satisfazer."""
+    size = int(board.size)
+    model = solve_cnf(encode_board(board), size * size)
+    if model is None:
+        return None
+    return decode_model(board, model)
+
+
+# ------------------------------------ DIMACS ----------------------------------
+def write_board_dimacs(board, stream):
+    """Escreve em DIMACS a fórmula do tabuleiro, com comentários que
+    explicam a numeração das variáveis."""
+    size = int(board.size)
+    encode_board(board).write_dimacs(stream, [
+        "takuzu {}x{}".format(size, size),
+        "a variável i*{} + j + 1 é verdadeira se a posição (i, j) for 1".format(size),
+        "as variáveis acima de {} são auxiliares".format(size * size)])
+
+
+def read_dimacs_model(stream, num_vars: int):
+    """Lê o modelo escrito por um resolvedor externo (linhas 'v ...' da
+    competição SAT, ou só os literais). Devolve None se o resolvedor tiver
+    respondido UNSATISFIABLE."""
+    model = [False] * (num_vars + 1)
+    for line in stream:
+        tokens = line.split()
+        if not tokens or tokens[0] in ("c", "s"):
+            if "UNSAT" in line:
+                return None
+            continue
+        if tokens[0] == "v":
+            tokens = tokens[1:]
+        for token in tokens:
+            literal = int(token)
+            if 0 < abs(literal) <= num_vars:
+                model[abs(literal)] = literal > 0
+    return model
+
+
+if __name__ == "__main__":
+    from takuzu import BOARDS
+
+    parser = argparse.ArgumentParser(
+        description="Exporta uma instância de Takuzu (lida do stdin) em DIMACS "
+                    "ou descodifica o modelo de um resolvedor SAT externo.")
+    parser.add_argument("--board", choices=BOARDS, default="numpy",
+        help="representação interna do tabuleiro")
+    parser.add_argument("--model", default=None,
+        help="ficheiro com o modelo do resolvedor externo: em vez da fórmula, "
+             "escreve o tabuleiro resolvido")
+    args = parser.parse_args()
+
+    board = BOARDS[args.board].parse_instance_from_stdin()
+    if args.model is None:
+        write_board_dimacs(board, sys.stdout)
+    else:
+        with open(args.model) as stream:
+            model = read_dimacs_model(stream, int(board.size) ** 2)
+        if model is None:
+            sys.exit("O resolvedor não encontrou solução.")
+        for i, j, value in decode_model(board, model):
+            board.set_number(i, j, value)
+        print(board, sep="")
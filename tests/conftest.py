@@ -0,0 +1,83 @@
+# conftest.py: Tabuleiros pequenos e contagens por força bruta, usados para
+# comparar as procuras e enumerações de takuzu com uma verificação das regras
+# que não depende do código do resolvedor.
+
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import itertools
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from takuzu_generator import random_solution
+
+# Número máximo de posições vazias (a força bruta tenta 2**MAX_EMPTY
+# preenchimentos por tabuleiro)
+MAX_EMPTY = 10
+
+
+def valid_grid(grid: np.ndarray) -> bool:
+    """Verifica as regras num tabuleiro completo: nunca três iguais seguidos,
+    no máximo (N+1)//2 de cada valor por linha/coluna, e linhas (e colunas)
+    todas diferentes."""
+    size = len(grid)
+    for lines in (grid, grid.T):
+        for line in lines:
+            if max(line.sum(), size - line.sum()) > (size + 1) // 2:
+                return False
+            if any(line[k] == line[k + 1] == line[k + 2] for k in range(size - 2)):
+                return False
+        if len({line.tobytes() for line in lines}) < size:
+            return False
+    return True
+
+
+def brute_force_solutions(cells: np.ndarray) -> list:
+    """Devolve todas as soluções (matrizes) do tabuleiro, experimentando
+    todos os preenchimentos das posições vazias."""
+    empty = list(zip(*np.nonzero(cells == 2)))
+    solutions = []
+    for values in itertools.product((0, 1), repeat=len(empty)):
+        grid = cells.copy()
+        for (i, j), value in zip(empty, values):
+            grid[i, j] = value
+        if valid_grid(grid):
+            solutions.append(grid)
+    return solutions
+
+
+def small_cells(rng: random.Random, size: int) -> np.ndarray:
+    """Tabuleiro obtido de uma solução aleatória, com até MAX_EMPTY posições
+    apagadas e, às vezes, uma posição dada trocada (e assim talvez sem
+    solução)."""
+    cells = random_solution(size, rng).to_array().copy()
+    positions = [(i, j) for i in range(size) for j in range(size)]
+    rng.shuffle(positions)
+    for i, j in positions[:min(MAX_EMPTY, size * size)]:
+        cells[i, j] = 2
+    if rng.random() < 0.3:
+        given = positions[MAX_EMPTY:]
+        if given:
+            i, j = rng.choice(given)
+            cells[i, j] = 1 - cells[i, j]
+    return cells
+
+
+@pytest.fixture(scope="session")
+def small_boards():
+    """Lista de (matriz de valores, soluções por força bruta) de tamanhos
+    2 a 6."""
+    rng = random.Random(33)
+    boards = []
+    for size in range(2, 7):
+        for _ in range(8):
+            cells = small_cells(rng, size)
+            boards.append((cells, brute_force_solutions(cells)))
+    return boards
@@ -0,0 +1,66 @@
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import argparse
+
+import pytest
+
+from takuzu import (BOARDS, BRANCHING, Takuzu, add_solver_arguments,
+                    check_solver_arguments, conflict_directed_search, solve)
+
+
+@pytest.mark.parametrize("board_class", BOARDS.values())
+@pytest.mark.parametrize("branching", BRANCHING)
+def test_cbj_agrees_with_brute_force(small_boards, board_class, branching):
+    for cells, solutions in small_boards:
+        solution = solve(board_class.from_cells(cells), "cbj",
+                         branching=branching)
+        if not solutions:
+            assert solution is None
+        else:
+            assert solution is not None and solution.is_solved()
+            assert any((solution.to_array() == grid).all() for grid in solutions)
+
+
+def test_cbj_small_nogood_limit(small_boards):
+    for cells, solutions in small_boards:
+        problem = Takuzu(BOARDS["bits"].from_cells(cells))
+        goal_node = conflict_directed_search(problem, max_nogood_size=2)
+        assert (goal_node is None) == (not solutions)
+
+
+@pytest.mark.parametrize("propagate", ["rules", False])
+def test_cbj_requires_full_propagation(small_boards, propagate):
+    cells, _ = small_boards[0]
+    with pytest.raises(ValueError):
+        solve(BOARDS["numpy"].from_cells(cells), "cbj", propagate=propagate)
+
+
+@pytest.mark.parametrize("options", [{"line_tables": True},
+                                     {"probe_budget": 10}])
+@pytest.mark.parametrize("propagate", ["rules", False])
+def test_partial_propagation_rejects_full_options(small_boards, propagate,
+                                                  options):
+    cells, _ = small_boards[0]
+    with pytest.raises(ValueError):
+        Takuzu(BOARDS["numpy"].from_cells(cells), propagate, **options)
+
+
+@pytest.mark.parametrize("argv", [["--rules", "--search", "cbj"],
+                                  ["--rules", "--lines"],
+                                  ["--rules", "--probe-budget", "5"],
+                                  ["--probe-budget", "-1"]])
+def test_invalid_argument_combinations(argv):
+    parser = argparse.ArgumentParser()
+    add_solver_arguments(parser)
+    with pytest.raises(SystemExit):
+        check_solver_arguments(parser, parser.parse_args(argv))
+
+
+def test_valid_argument_combinations():
+    parser = argparse.ArgumentParser()
+    add_solver_arguments(parser)
+    for argv in (["--rules", "--search", "trail"],
+                 ["--lines", "--probe-budget", "5", "--search", "cbj"]):
+        check_solver_arguments(parser, parser.parse_args(argv))
@@ -0,0 +1,59 @@
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import glob
+import io
+import os
+
+import pytest
+
+from takuzu import BOARDS, iter_cells
+from takuzu_corpus import (Corpus, corpus_to_text, format_cells, is_corpus,
+                           pack_cells, unpack_cells, text_to_corpus,
+                           write_corpus)
+
+TESTS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..",
+                                      "testes-takuzu", "input_T*")))
+
+
+def test_pack_round_trip(small_boards):
+    for cells, _ in small_boards:
+        assert (unpack_cells(pack_cells(cells), len(cells)) == cells).all()
+
+
+def test_text_round_trip(tmp_path):
+    expected = []
+    for path in TESTS:
+        with open(path) as stream:
+            expected.extend(iter_cells(stream))
+
+    path = str(tmp_path / "testes.tkz")
+    streams = [open(name) for name in TESTS]
+    try:
+        assert text_to_corpus(streams, path) == len(expected)
+    finally:
+        for stream in streams:
+            stream.close()
+    assert is_corpus(path) and not is_corpus(TESTS[0])
+
+    out = io.StringIO()
+    corpus_to_text(path, out)
+    cells = list(iter_cells(io.StringIO(out.getvalue())))
+    assert len(cells) == len(expected)
+    for got, want in zip(cells, expected):
+        assert (got == want).all()
+
+
+@pytest.mark.parametrize("board_class", BOARDS.values())
+def test_corpus_access(tmp_path, small_boards, board_class):
+    boards = [board_class.from_cells(cells) for cells, _ in small_boards]
+    path = str(tmp_path / "pequenos.tkz")
+    assert write_corpus(path, boards) == len(boards)
+
+    with Corpus(path) as corpus:
+        assert len(corpus) == len(boards)
+        for k in reversed(range(len(boards))):
+            assert (corpus[k] == small_boards[k][0]).all()
+            assert str(corpus.board(k, board_class)) == str(boards[k])
+        assert format_cells(corpus[0], header=False) == str(boards[0])
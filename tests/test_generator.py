@@ -0,0 +1,36 @@
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import pytest
+
+from takuzu import BitBoard, count_solutions
+from takuzu_generator import generate_puzzle
+
+
+def density(board) -> float:
+    return (board.to_array() != 2).mean()
+
+
+@pytest.mark.parametrize("size", range(4, 11))
+def test_sparse_puzzles_are_unique(size):
+    for seed in range(3):
+        puzzle = generate_puzzle(size, 0.2, seed)
+        assert count_solutions(BitBoard.from_cells(puzzle.to_array()),
+                               search="rows") == 1
+        # Sem retirar posições a densidade fica perto de metade
+        assert density(puzzle) < density(generate_puzzle(size, None, seed))
+
+
+def test_density_is_reached_when_possible():
+    for target in (0.3, 0.6, 0.9):
+        puzzle = generate_puzzle(16, target, 5)
+        assert density(puzzle) == pytest.approx(target, abs=0.5 / 16 ** 2)
+        assert count_solutions(puzzle, 2, search="rows") == 1
+
+
+def test_same_seed_same_puzzle():
+    for size_density in ((12, None), (12, 0.25)):
+        first = generate_puzzle(*size_density, seed=7)
+        assert (first.to_array() ==
+                generate_puzzle(*size_density, seed=7).to_array()).all()
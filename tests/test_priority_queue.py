@@ -0,0 +1,124 @@
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import heapq
+import random
+
+import pytest
+
+from utils import PriorityQueue
+
+
+class ListPriorityQueue:
+    """A PriorityQueue anterior (só a lista do heap), usada como referência."""
+    def __init__(self, order='min', f=lambda x: x):
+        self.heap = []
+        self.f = f if order == 'min' else (lambda x: -f(x))
+
+    def append(self, item):
+        heapq.heappush(self.heap, (self.f(item), item))
+
+    def pop(self):
+        return heapq.heappop(self.heap)[1]
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, key):
+        return any(item == key for _, item in self.heap)
+
+    def __getitem__(self, key):
+        for value, item in self.heap:
+            if item == key:
+                return value
+        raise KeyError(key)
+
+    def __delitem__(self, key):
+        del self.heap[[item == key for _, item in self.heap].index(True)]
+        heapq.heapify(self.heap)
+
+
+class Item:
+    """Item comparado só pela chave, com um custo à parte (como um Node,
+    que é igual a outro com o mesmo estado mesmo que o custo seja outro)."""
+    def __init__(self, key, cost):
+        self.key, self.cost = key, cost
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+def random_operations(rng, queue, reference, keys, steps=2000):
+    """Aplica as mesmas operações às duas filas e compara os resultados."""
+    for _ in range(steps):
+        key = rng.randrange(keys)
+        operation = rng.random()
+        if operation < 0.45 or not len(reference):
+            queue.append(key)
+            reference.append(key)
+        elif operation < 0.65:
+            assert queue.pop() == reference.pop()
+        elif operation < 0.85:
+            assert (key in queue) == (key in reference)
+            if key in reference:
+                assert queue[key] == reference[key]
+            else:
+                with pytest.raises(KeyError):
+                    queue[key]
+        elif key in reference:
+            # -> apagar e voltar a inserir (decrease-key)
+            del queue[key]
+            del reference[key]
+            if rng.random() < 0.5:
+                queue.append(key)
+                reference.append(key)
+        assert len(queue) == len(reference)
+    while len(reference):
+        assert queue.pop() == reference.pop()
+    with pytest.raises(Exception):
+        queue.pop()
+
+
+@pytest.mark.parametrize("order", ["min", "max"])
+@pytest.mark.parametrize("keys", [5, 50, 1000])
+def test_same_results_as_list_queue(order, keys):
+    # Itens repetidos (keys pequeno) e custos iguais para itens diferentes
+    rng = random.Random(keys)
+    f = lambda x: x % 7
+    random_operations(rng, PriorityQueue(order, f), ListPriorityQueue(order, f),
+                      keys)
+
+
+def test_equal_items_with_different_values():
+    # Com itens iguais e custos diferentes, [] e del usam o primeiro inserido
+    rng = random.Random(1)
+    queue = PriorityQueue("min", lambda item: item.cost)
+    live = []   # itens na fila, por ordem de inserção
+    for _ in range(3000):
+        if rng.random() < 0.5 or not live:
+            item = Item(rng.randrange(10), rng.randrange(100))
+            queue.append(item)
+            live.append(item)
+            continue
+        key = Item(rng.randrange(10), None)
+        first = next((item for item in live if item == key), None)
+        if first is None:
+            assert key not in queue
+        elif rng.random() < 0.5:
+            assert queue[key] == first.cost
+        else:
+            del queue[key]
+            live.remove(first)
+        assert len(queue) == len(live)
+
+    costs = []
+    while len(queue):
+        costs.append(queue.pop().cost)
+    assert costs == sorted(item.cost for item in live)
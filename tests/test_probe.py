@@ -0,0 +1,42 @@
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import pytest
+
+from takuzu import (BOARDS, count_solutions, probe_literals,
+                    propagate_constraints, solve, undo_trail)
+
+
+@pytest.mark.parametrize("board_class", BOARDS.values())
+@pytest.mark.parametrize("branching", ["first", "probe"])
+def test_probing_counts_agree_with_brute_force(small_boards, board_class,
+                                               branching):
+    for cells, solutions in small_boards:
+        board = board_class.from_cells(cells)
+        assert count_solutions(board, probe_budget=20,
+                               branching=branching) == len(solutions)
+        solution = solve(board, "trail", probe_budget=20, branching=branching)
+        assert (solution is None) == (not solutions)
+
+
+@pytest.mark.parametrize("board_class", BOARDS.values())
+def test_probes_restored_on_undo(small_boards, board_class):
+    for cells, _ in small_boards:
+        board = board_class.from_cells(cells)
+        if not propagate_constraints(board) or not board.is_consistent():
+            continue
+        probe_literals(board, 20)
+        probes, before = board.probes, board.to_array()
+
+        trail = []
+        empty = [(i, j) for i, j in zip(*(before == 2).nonzero())]
+        for i, j in empty[:1]:
+            board.set_number(int(i), int(j), 0)
+            trail.append((int(i), int(j)))
+        if propagate_constraints(board, None, trail) and board.is_consistent():
+            probe_literals(board, 20, trail)
+
+        undo_trail(board, trail, 0)
+        assert board.probes == probes
+        assert (board.to_array() == before).all()
@@ -0,0 +1,83 @@
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import random
+import time
+
+import numpy as np
+import pytest
+
+import takuzu
+from takuzu import (BOARDS, ROW_DP_MAX_WORK, Takuzu, count_solutions,
+                    depth_first_trail_search, iter_solutions, row_dp_search,
+                    solve)
+from takuzu_dp import WorkLimit, row_solutions
+from takuzu_generator import random_solution
+
+
+def as_set(grids) -> set:
+    return {grid.tobytes() for grid in grids}
+
+
+@pytest.mark.parametrize("board_class", BOARDS.values())
+def test_row_dp_counts_agree_with_brute_force(small_boards, board_class):
+    for cells, solutions in small_boards:
+        board = board_class.from_cells(cells)
+        assert count_solutions(board, search="rows") == len(solutions)
+        assert as_set(solution.to_array() for solution in
+                      iter_solutions(board, "rows")) == as_set(solutions)
+
+
+def test_row_dp_search_agrees_with_brute_force(small_boards):
+    for cells, solutions in small_boards:
+        solution = solve(BOARDS["numpy"].from_cells(cells), "rows")
+        assert (solution is None) == (not solutions)
+
+
+def test_row_dp_work_limit(small_boards):
+    # As linhas candidatas de um tabuleiro vazio 6x6 excedem o limite
+    cells, _ = small_boards[-1]
+    cells = cells.copy()
+    cells[:] = 2
+    with pytest.raises(WorkLimit):
+        list(row_solutions(BOARDS["numpy"].from_cells(cells), max_work=10))
+    # A procura continua com o trilho quando a PD desiste
+    goal_node = row_dp_search(Takuzu(BOARDS["numpy"].from_cells(cells)),
+                              max_work=10)
+    assert goal_node.state.board.is_solved()
+
+
+def sparse_cells(size: int, seed: int, density: float) -> np.ndarray:
+    """Solução aleatória com só uma fração 'density' das posições dadas."""
+    rng = random.Random(seed)
+    cells = random_solution(size, rng).to_array().copy()
+    for i in range(size):
+        for j in range(size):
+            if rng.random() > density:
+                cells[i, j] = 2
+    return cells
+
+
+def test_row_dp_gives_up_quickly_on_large_sparse_boards(monkeypatch):
+    # Antes, só gerar as candidatas de um tabuleiro vazio 28x28 demorava
+    # dezenas de segundos
+    for size in (28, 40):
+        cells = np.full((size, size), 2, dtype=np.uint8)
+        start = time.perf_counter()
+        with pytest.raises(WorkLimit):
+            next(row_solutions(BOARDS["bits"].from_cells(cells), ROW_DP_MAX_WORK))
+        assert time.perf_counter() - start < 5
+
+    fallbacks = []
+
+    def trail_search(problem):
+        fallbacks.append(problem)
+        return depth_first_trail_search(problem)
+
+    monkeypatch.setattr(takuzu, "depth_first_trail_search", trail_search)
+    board = BOARDS["bits"].from_cells(sparse_cells(28, 0, 0.5))
+    start = time.perf_counter()
+    goal_node = row_dp_search(Takuzu(board, branching="balance"))
+    assert time.perf_counter() - start < 10
+    assert len(fallbacks) == 1 and goal_node.state.board.is_solved()
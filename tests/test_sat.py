@@ -0,0 +1,87 @@
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import io
+
+import pytest
+
+from takuzu import BOARDS, solve
+from takuzu_sat import (decode_model, encode_board, read_dimacs_model,
+                        solve_board, solve_cnf, write_board_dimacs)
+
+
+def read_dimacs(text: str):
+    """Devolve (número de variáveis, cláusulas) de uma fórmula DIMACS."""
+    num_vars, clauses = None, []
+    for line in text.splitlines():
+        tokens = line.split()
+        if not tokens or tokens[0] == "c":
+            continue
+        if tokens[0] == "p":
+            num_vars, num_clauses = int(tokens[2]), int(tokens[3])
+            continue
+        literals = list(map(int, tokens))
+        assert literals[-1] == 0
+        clauses.append(literals[:-1])
+    assert len(clauses) == num_clauses
+    return num_vars, clauses
+
+
+def satisfies(model, clauses) -> bool:
+    return all(any(model[abs(literal)] == (literal > 0) for literal in clause)
+               for clause in clauses)
+
+
+def matches(board, actions, solutions) -> bool:
+    """Verifica se as ações preenchem o tabuleiro com uma das soluções."""
+    board = board.copy()
+    for i, j, value in actions:
+        board.set_number(i, j, value)
+    return any((board.to_array() == grid).all() for grid in solutions)
+
+
+@pytest.mark.parametrize("board_class", BOARDS.values())
+def test_solve_board_agrees_with_brute_force(small_boards, board_class):
+    for cells, solutions in small_boards:
+        board = board_class.from_cells(cells)
+        actions = solve_board(board)
+        if not solutions:
+            assert actions is None
+        else:
+            assert actions is not None and matches(board, actions, solutions)
+
+
+def test_sat_search_agrees_with_brute_force(small_boards):
+    for cells, solutions in small_boards:
+        solution = solve(BOARDS["bits"].from_cells(cells), "sat")
+        assert (solution is None) == (not solutions)
+        if solution is not None:
+            assert any((solution.to_array() == grid).all() for grid in solutions)
+
+
+def test_dimacs_round_trip(small_boards):
+    for cells, solutions in small_boards:
+        board = BOARDS["numpy"].from_cells(cells)
+        stream = io.StringIO()
+        write_board_dimacs(board, stream)
+        num_vars, clauses = read_dimacs(stream.getvalue())
+
+        cnf = encode_board(board)
+        assert num_vars == cnf.num_vars and clauses == cnf.clauses
+
+        # Modelo de um resolvedor externo: todas as variáveis decididas
+        model = solve_cnf(cnf)
+        if model is None:
+            assert not solutions
+            output = "s UNSATISFIABLE\n"
+        else:
+            assert satisfies(model, clauses)
+            output = "s SATISFIABLE\nv {} 0\n".format(" ".join(
+                str(var if model[var] else -var) for var in range(1, num_vars + 1)))
+
+        model = read_dimacs_model(io.StringIO(output), num_vars)
+        if model is None:
+            assert not solutions
+        else:
+            assert matches(board, decode_model(board, model), solutions)
@@ -0,0 +1,69 @@
+# Grupo 33:
+# 99216 Filipa Magalhães
+# 99275 Mário Santos
+
+import pytest
+
+from search import (GraphProblem, PATH_MODES, astar_search,
+                    breadth_first_graph_search, breadth_first_tree_search,
+                    depth_first_graph_search, depth_first_tree_search,
+                    greedy_search, iterative_deepening_search, romania_map,
+                    root_node, uniform_cost_search)
+from takuzu import BOARDS, Takuzu
+
+SEARCHES = [breadth_first_tree_search, depth_first_tree_search,
+            depth_first_graph_search, breadth_first_graph_search,
+            uniform_cost_search, greedy_search, astar_search,
+            iterative_deepening_search]
+
+
+def test_root_node_modes():
+    problem = GraphProblem('Arad', 'Bucharest', romania_map)
+    for path, node_class in PATH_MODES.items():
+        node = root_node(problem, path)
+        assert type(node) is node_class
+        assert node.state == 'Arad' and node.depth == 0 and node.path_cost == 0
+    with pytest.raises(KeyError):
+        root_node(problem, 'grandparent')
+
+
+@pytest.mark.parametrize("search", SEARCHES, ids=lambda search: search.__name__)
+@pytest.mark.parametrize("propagate", [True, False])
+def test_path_modes_agree_with_parent_nodes(small_boards, search, propagate):
+    for cells, _ in small_boards:
+        goals = {path: search(Takuzu(BOARDS["numpy"].from_cells(cells),
+                                     propagate), path=path)
+                 for path in PATH_MODES}
+        expected = goals["parent"]
+        if expected is None:
+            assert all(goal is None for goal in goals.values())
+            continue
+
+        for path, goal in goals.items():
+            assert type(goal) is PATH_MODES[path]
+            assert (goal.state.board.to_array() ==
+                    expected.state.board.to_array()).all()
+            assert (goal.depth, goal.path_cost, goal.action) == \
+                   (expected.depth, expected.path_cost, expected.action)
+        assert goals["actions"].solution() == expected.solution()
+        with pytest.raises(ValueError):
+            goals["actions"].path()
+        with pytest.raises(ValueError):
+            goals["none"].solution()
+
+
+@pytest.mark.parametrize("path", PATH_MODES)
+def test_graph_searches_on_romania(path):
+    # Estados repetidos: o conjunto frontier_states tem de evitar duplicados
+    # tal como a pesquisa linear na fronteira fazia
+    problem = GraphProblem('Arad', 'Bucharest', romania_map)
+    goal = breadth_first_graph_search(problem, path)
+    assert goal.state == 'Bucharest' and goal.depth == 3
+    goal = depth_first_graph_search(problem, path)
+    assert goal.state == 'Bucharest' and goal.depth == 7
+    if path != 'none':
+        assert breadth_first_graph_search(problem, path).solution() == \
+               ['Sibiu', 'Fagaras', 'Bucharest']
+        assert depth_first_graph_search(problem, path).solution() == \
+               ['Timisoara', 'Lugoj', 'Mehadia', 'Drobeta', 'Craiova',
+                'Pitesti', 'Bucharest']
@@ -407,7 +407,8 @@ class injection:
 
 def memoize(fn, slot=None, maxsize=32):
     """Memoize fn: make it remember the computed value for any argument list.
-    If slot is specified, store result in that slot of first argument.
+    If slot is specified, store result in that slot of first argument (an
+    attribute, or a declared __slots__ entry that is still unset).
     If slot is false, use lru_cache for caching the values."""
     if slot:
         def memoized_fn(obj, *args):
@@ -724,10 +725,20 @@ class PriorityQueue:
     order) is returned first.
     If order is 'min', the item with minimum f(x) is
     returned first; if order is 'max', then it is the item with maximum f(x).
-    Also supports dict-like lookup."""
+    Also supports dict-like lookup.
+    Items must be hashable: each live heap entry is also indexed by item, so
+    membership and lookup are O(1) and deletion only marks the entry as
+    removed (it is skipped when it reaches the top of the heap), which makes
+    delete + append an O(log n) decrease-key.
+    When several equal items are queued, lookup and deletion act on the one
+    that was appended first (the list-based version used whichever came
+    first in the heap array); pop order is unchanged."""
 
     def __init__(self, order='min', f=lambda x: x):
         self.heap = []
+        # item -> list of live heap entries [f(item), item, alive]
+        self.entries = {}
+        self.size = 0
         if order == 'min':
             self.f = f
         elif order == 'max':  # now item with max f(x)
@@ -737,7 +748,10 @@ class PriorityQueue:
 
     def append(self, item):
         """Insert item at its correct position."""
-        heapq.heappush(self.heap, (self.f(item), item))
+        entry = [self.f(item), item, True]
+        self.entries.setdefault(item, []).append(entry)
+        heapq.heappush(self.heap, entry)
+        self.size += 1
 
     def extend(self, items):
         """Insert each item in items at its correct position."""
@@ -747,34 +761,49 @@ class PriorityQueue:
     def pop(self):
         """Pop and return the item (with min or max f(x) value)
         depending on the order."""
-        if self.heap:
-            return heapq.heappop(self.heap)[1]
-        else:
-            raise Exception('Trying to pop from empty PriorityQueue.')
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            if entry[2]:
+                self._forget(entry)
+                return entry[1]
+        raise Exception('Trying to pop from empty PriorityQueue.')
+
+    def _forget(self, entry):
+        """Remove a live entry from the index."""
+        entry[2] = False
+        self.size -= 1
+        entries = self.entries[entry[1]]
+        del entries[next(k for k, other in enumerate(entries) if other is entry)]
+        if not entries:
+            del self.entries[entry[1]]
 
     def __len__(self):
         """Return current capacity of PriorityQueue."""
-        return len(self.heap)
+        return self.size
 
     def __contains__(self, key):
         """Return True if the key is in PriorityQueue."""
-        return any([item == key for _, item in self.heap])
+        return key in self.entries
 
     def __getitem__(self, key):
-        """Returns the first value associated with key in PriorityQueue.
-        Raises KeyError if key is not present."""
-        for value, item in self.heap:
-            if item == key:
-                return value
-        raise KeyError(str(key) + " is not in the priority queue")
+        """Returns the value of the earliest appended entry equal to key
+        still in PriorityQueue. Raises KeyError if key is not present."""
+        try:
+            return self.entries[key][0][0]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
 
     def __delitem__(self, key):
-        """Delete the first occurrence of key."""
+        """Delete the earliest appended entry equal to key."""
         try:
-            del self.heap[[item == key for _, item in self.heap].index(True)]
-        except ValueError:
+            entry = self.entries[key][0]
+        except KeyError:
             raise KeyError(str(key) + " is not in the priority queue")
-        heapq.heapify(self.heap)
+        self._forget(entry)
+        # Rebuild the heap once removed entries outnumber the live ones
+        if len(self.heap) > 2 * self.size + 32:
+            self.heap = [entry for entry in self.heap if entry[2]]
+            heapq.heapify(self.heap)
 
 
 # ______________________________________________________________________________